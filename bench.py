@@ -0,0 +1,399 @@
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from typing import List, Literal
+
+from pydantic import Field, TypeAdapter
+
+import core
+import decoder
+from client import Client
+import diff
+import exceptions
+import funcs
+import models
+import recording
+import workers
+from stub_server import StubServer, region_payload
+
+BENCH_REGION = '1'
+
+
+def print_stats(name: str, samples: List[float], unit: str = 'ms', scale: float = 1000):
+    samples = sorted(samples)
+    print(
+        f"{name:<24} n={len(samples):<6} "
+        f"mean={statistics.mean(samples) * scale:10.3f}{unit} "
+        f"p50={samples[len(samples) // 2] * scale:10.3f}{unit} "
+        f"max={samples[-1] * scale:10.3f}{unit}"
+    )
+
+
+class BenchDirectory:
+    """Runs a benchmark inside a temporary working directory so status files stay untouched."""
+
+    def __enter__(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        return self._tmp.name
+
+    def __exit__(self, *exc):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+
+async def measure_alert_latency(server: StubServer, rounds: int, check_interval: int) -> List[float]:
+    fired = asyncio.Event()
+
+    async def on_alert(event: models.AlertEvent):
+        fired.set()
+
+    core.EventHandler.clear_callbacks(models.EventType.alert)
+    core.EventHandler.register_callback(on_alert, models.EventType.alert)
+
+    server.set_alerts([region_payload(BENCH_REGION, [])])
+    task = asyncio.create_task(funcs.mainloop())
+    await asyncio.sleep(0.5)
+
+    latencies = []
+    try:
+        for i in range(rounds):
+            await asyncio.sleep(random.uniform(0, check_interval))
+            fired.clear()
+            started = time.perf_counter()
+            server.set_alerts([
+                region_payload(BENCH_REGION, [models.AlertType.AIR] if i % 2 == 0 else [])
+            ])
+            await fired.wait()
+            latencies.append(time.perf_counter() - started)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    return latencies
+
+
+async def bench_stream(rounds: str = '6', check_interval: str = '2'):
+    rounds, check_interval = int(rounds), int(check_interval)
+    conf = core.Config()
+
+    with BenchDirectory():
+        server = StubServer()
+        await server.start()
+        try:
+            for name, stream_url, stream_type in (
+                    ('polling', None, models.StreamType.sse),
+                    ('sse', f'{server.url}/alerts/stream', models.StreamType.sse),
+                    ('websocket', f'{server.url}/alerts/ws', models.StreamType.websocket),
+            ):
+                if os.path.exists(core.Status.FILE_NAME):
+                    os.remove(core.Status.FILE_NAME)
+                core.Status.reset()
+
+                core.Config._conf = conf.model_copy(update=dict(
+                    reginId=BENCH_REGION,
+                    api_base_url=server.url,
+                    check_interval=check_interval,
+                    stream_url=stream_url,
+                    stream_type=stream_type,
+                    regions=[],
+                    actions=[],
+                    fanout_port=None,
+                    replay_file=None,
+                    record_file=None,
+                    journal_enabled=False,
+                ))
+                print_stats(
+                    f'alert->action {name}',
+                    await measure_alert_latency(server, rounds, check_interval)
+                )
+        finally:
+            core.Config._conf = conf
+            core.Config.register_config_actions()
+            await server.stop()
+
+
+def synthetic_alerts(count: int, offset: int = 0) -> List[models.Alert]:
+    alert_types = list(models.AlertType)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        models.Alert(
+            regionId=str((offset + i) // len(alert_types)),
+            regionType=models.RegionType.Community,
+            type=alert_types[(offset + i) % len(alert_types)],
+            lastUpdate=now,
+        )
+        for i in range(count)
+    ]
+
+
+def list_diff(previous: List[models.Alert], current: List[models.Alert]):
+    return (
+        [alert for alert in current if alert not in previous],
+        [alert for alert in previous if alert not in current],
+    )
+
+
+async def bench_diff(sizes: str = '10,100,1000,10000'):
+    for size in map(int, sizes.split(',')):
+        churn = max(1, size // 10)
+        previous = synthetic_alerts(size)
+        current = synthetic_alerts(size, offset=churn)
+
+        for name, func in (('list membership', list_diff), ('keyed diff', diff.diff_alerts)):
+            timer = timeit.Timer(lambda: func(previous, current))
+            number, _ = timer.autorange()
+            print_stats(
+                f'{name} n={size}',
+                [t / number for t in timer.repeat(repeat=5, number=number)]
+            )
+
+
+def synthetic_payload(region_count: int) -> bytes:
+    alert_types = list(models.AlertType)
+    return decoder.json.dumps([
+        region_payload(str(i), alert_types[:i % 3])
+        for i in range(region_count)
+    ]).encode('utf-8')
+
+
+def measure_peak_allocation(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def bench_decode(region_count: str = '1500'):
+    payload = synthetic_payload(int(region_count))
+    warm_decoder = decoder.RegionDecoder()
+    warm_decoder.decode(payload)
+
+    cases = (
+        ('generic adapter', lambda: TypeAdapter(List[models.Region]).validate_python(decoder.json.loads(payload))),
+        ('cached adapter', lambda: decoder.REGIONS_ADAPTER.validate_json(payload)),
+        ('fast decode cold', lambda: decoder.RegionDecoder().decode(payload)),
+        ('fast decode warm', lambda: warm_decoder.decode(payload)),
+    )
+
+    print(f"payload: {region_count} regions, {len(payload)} bytes, orjson={'yes' if decoder.orjson else 'no'}")
+    for name, func in cases:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        print_stats(name, [t / number for t in timer.repeat(repeat=5, number=number)])
+        print(f"{'':<24} peak allocation={measure_peak_allocation(func) / 1024:10.1f}KiB")
+
+
+async def bench_failover(requests: str = '10', hedge_delay: str = '0.2'):
+    primary, secondary = StubServer(), StubServer()
+    await primary.start()
+    await secondary.start()
+    try:
+        for server in (primary, secondary):
+            server.set_alerts([region_payload(BENCH_REGION, [models.AlertType.AIR])])
+
+        for name, delay, fail in (('healthy', 0, False), ('slow primary', 3, False), ('broken primary', 0, True)):
+            primary.delay, primary.fail = delay, fail
+            primary.requests = secondary.requests = 0
+            client = Client(
+                core.Session(), base_path=primary.url, fallback_paths=[secondary.url],
+                hedge_delay=float(hedge_delay), reset_timeout=60
+            )
+
+            latencies = []
+            for _ in range(int(requests)):
+                started = time.perf_counter()
+                await client.get_alerts(BENCH_REGION)
+                latencies.append(time.perf_counter() - started)
+
+            print_stats(f'failover {name}', latencies)
+            print(f"{'':<24} primary={primary.requests} secondary={secondary.requests} "
+                  f"primary circuit={client.endpoints[0].breaker.state}")
+    finally:
+        await primary.stop()
+        await secondary.stop()
+
+
+async def synthetic_recording(file_name: str, count: int, region_count: int):
+    alert_types = list(models.AlertType)
+    started = time.time()
+    for i in range(count):
+        await recording.record(file_name, decoder.json.dumps([
+            region_payload(
+                str(region), alert_types[:(i + region) % 3],
+                datetime.datetime.fromtimestamp(started + i * 10 + region % 10, datetime.timezone.utc)
+            )
+            for region in range(region_count)
+        ]), started + i * 10)
+
+
+async def bench_replay(file_name: str = None, actions: str = 'stub', records: str = '500', region_count: str = '25'):
+    """Replays a recording as fast as possible and reports per-stage timings; without a file a synthetic one is used."""
+    conf = core.Config()
+    file_name = os.path.abspath(file_name) if file_name is not None else None
+
+    with BenchDirectory():
+        if file_name is None:
+            file_name = os.path.abspath('replay.jsonl')
+            await synthetic_recording(file_name, int(records), int(region_count))
+            region_ids = [str(i) for i in range(int(region_count))]
+        else:
+            region_ids = conf.region_ids
+
+        fired = 0
+
+        async def on_alert(event: models.AlertEvent):
+            nonlocal fired
+            fired += 1
+
+        core.Config._conf = conf.model_copy(update=dict(
+            regions=[models.RegionConfigModel(regionId=region_id) for region_id in region_ids],
+            actions=[],
+            journal_enabled=False,
+            record_file=None,
+            replay_file=None,
+        ))
+        if actions == 'real':
+            core.Config._conf.regions = conf.watched_regions
+            core.Config.register_config_actions()
+        else:
+            core.EventHandler.clear_callbacks(models.EventType.alert)
+        core.EventHandler.register_callback(on_alert, models.EventType.alert)
+        core.Status.reset()
+
+        decode, trigger, dispatch = [], [], []
+        entries = recording.load(file_name)
+        started = time.perf_counter()
+        try:
+            for i, (_, response) in enumerate(entries):
+                t0 = time.perf_counter()
+                regions = await funcs.receive_status(response)
+                t1 = time.perf_counter()
+                if regions is not None:
+                    await funcs.check_alarm(regions, i == 0)
+                t2 = time.perf_counter()
+                await core.EventHandler.join()
+                t3 = time.perf_counter()
+
+                decode.append(t1 - t0)
+                trigger.append(t2 - t1)
+                dispatch.append(t3 - t2)
+            elapsed = time.perf_counter() - started
+            await core.Status().close()
+        finally:
+            core.EventHandler.unregister_callback(on_alert, models.EventType.alert)
+            core.Config._conf = conf
+            core.Config.register_config_actions()
+
+    print(f"replayed {len(entries)} responses, {fired} alert events, actions={actions}")
+    print_stats('decode', decode)
+    print_stats('diff + trigger', trigger)
+    print_stats('dispatch + actions', dispatch)
+    print(f"throughput: {len(entries) / elapsed:.1f} responses/s, {fired / elapsed:.1f} events/s")
+
+
+async def measure_startup(args: List[str], server: StubServer, until_exit: bool) -> float:
+    """Time from spawning the process until its first API request reaches the stub, or until it exits."""
+    server.requests = 0
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        if until_exit:
+            await process.wait()
+        else:
+            while server.requests == 0 and process.returncode is None:
+                await asyncio.sleep(0.001)
+        return time.perf_counter() - started
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def bench_startup(runs: str = '5'):
+    console = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'console.py')
+
+    with BenchDirectory():
+        server = StubServer()
+        await server.start()
+        server.set_alerts([region_payload(BENCH_REGION, [])])
+
+        with open('conf.json', 'w', encoding='utf-8') as f:
+            f.write(models.ConfigModel(
+                reginId=BENCH_REGION, api_base_url=server.url, journal_enabled=False
+            ).model_dump_json())
+
+        try:
+            for name, args, until_exit in (
+                    ('time to first poll', [console], False),
+                    ('-c regions', [console, '-c', 'regions'], True),
+            ):
+                samples = []
+                for _ in range(int(runs)):
+                    if os.path.exists(core.Session.REGIONS_CACHE_FILE):
+                        os.remove(core.Session.REGIONS_CACHE_FILE)
+                    samples.append(await measure_startup(args, server, until_exit))
+                print_stats(name, samples)
+        finally:
+            await server.stop()
+
+
+class BlockingAction(models.AlertAction):
+    """Blocks its process with a synchronous call, like a hung GUI automation call."""
+
+    type: Literal[models.ActionType.none] = Field(default=models.ActionType.none)
+    seconds: float = Field(default=60)
+
+    async def act(self, event: models.AlertEvent) -> None:
+        time.sleep(self.seconds)
+
+
+async def bench_workers(runs: str = '20', timeout: str = '1', hang_grace: str = '1'):
+    """Dispatch latency to warm workers, then the hang paths: a hanging command and a blocking action."""
+    timeout, grace = float(timeout), workers.WorkerPool.HANG_GRACE
+    workers.WorkerPool.HANG_GRACE = float(hang_grace)
+
+    event = models.AlertEvent(alert_type=models.AlertEventType.start, alert=synthetic_alerts(1)[0])
+    alert_type = event.alert.type
+    cases = (
+        ('echo', models.LocalConsoleExecuteAction(
+            commands={alert_type: {models.AlertEventType.start: 'echo ok'}}, timeout=timeout, isolated=True
+        ), int(runs)),
+        ('hanging command', models.LocalConsoleExecuteAction(
+            commands={alert_type: {models.AlertEventType.start: 'sleep 600'}}, timeout=timeout, isolated=True
+        ), 3),
+        ('blocking action', BlockingAction(timeout=timeout, isolated=True), 3),
+        ('echo after respawn', models.LocalConsoleExecuteAction(
+            commands={alert_type: {models.AlertEventType.start: 'echo ok'}}, timeout=timeout, isolated=True
+        ), int(runs)),
+    )
+
+    workers.WorkerPool.start(2)
+    try:
+        await workers.WorkerPool.run(cases[0][1], event)
+        for name, action, count in cases:
+            latencies, errors = [], {}
+            for _ in range(count):
+                started = time.perf_counter()
+                try:
+                    await workers.WorkerPool.run(action, event)
+                except exceptions.EventActionException as exc:
+                    errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+                latencies.append(time.perf_counter() - started)
+            print_stats(name, latencies)
+            print(f"{'':<24} errors={errors or 'none'}")
+    finally:
+        workers.WorkerPool.HANG_GRACE = grace
+        workers.WorkerPool.close()
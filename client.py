@@ -1,15 +1,167 @@
-from aiohttp import ClientSession, ClientResponse
+import asyncio
+import datetime
+import email.utils
+import json
+import os
+import random
+import time
+from typing import Dict, NamedTuple, Optional, Sequence, List, Mapping
+
+from aiohttp import ClientSession, ClientResponse, ClientError, ClientResponseError, ContentTypeError
+
+
+class CachedResponse(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: bytes
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint after repeated failures, retrying it after reset_timeout."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if self.allow() else 'open'
+
+    def allow(self) -> bool:
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class TokenBucket:
+    """Spaces requests to stay within a quota; also honours server-imposed pauses."""
+
+    def __init__(self, rate: float = 0, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def configure(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def observe(self, headers: Mapping[str, str]):
+        """Track remaining quota from RateLimit-*/X-RateLimit-* response headers."""
+        remaining = _header_number(headers, "ratelimit-remaining", "x-ratelimit-remaining")
+        if remaining is None:
+            return
+
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, remaining)
+
+        reset = _header_number(headers, "ratelimit-reset", "x-ratelimit-reset")
+        if remaining < 1 and reset is not None:
+            self.pause(reset - time.time() if reset > 10 ** 9 else reset)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+
+            wait = self.blocked_until - now
+            if wait <= 0:
+                if self.rate <= 0:
+                    return
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            await asyncio.sleep(wait)
+
+
+def _header_number(headers: Mapping[str, str], *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        # '-0000' dates parse as naive; HTTP dates are always UTC
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class Endpoint:
+    def __init__(self, base_path: str, breaker: CircuitBreaker, limiter: TokenBucket):
+        self.base_path = base_path
+        self.breaker = breaker
+        self.limiter = limiter
 
 
 class Client:
     """Class to make authenticated requests."""
 
     REQUEST_TIMEOUT = 10
+    REGIONS_CACHE_TTL = 24 * 60 * 60
+    HEDGE_DELAY = 1.0
+    RETRY_BACKOFF = 0.5
+    MAX_RETRY_DELAY = 10
+
+    _limiters: Dict[str, TokenBucket] = {}
 
-    def __init__(self, session: ClientSession, access_token: str = None, base_path: str = None):
+    def __init__(
+            self, session: ClientSession, access_token: str = None, base_path: str = None,
+            regions_cache_file: str = None, regions_cache_ttl: float = REGIONS_CACHE_TTL,
+            fallback_paths: Sequence[str] = (), hedge_delay: float = HEDGE_DELAY,
+            failure_threshold: int = 3, reset_timeout: float = 30,
+            rate_limit: float = 0, rate_limit_burst: int = 1, max_retries: int = 3
+    ):
         """Initialize the client."""
         self.session = session
         self.access_token = access_token
+        self.regions_cache_file = regions_cache_file
+        self.regions_cache_ttl = regions_cache_ttl
+        self.hedge_delay = hedge_delay
+        self.max_retries = max_retries
+        self._cache: Dict[str, CachedResponse] = {}
+        self.not_modified = 0
 
         if base_path is None:
             self.BASE_PATH = (
@@ -20,8 +172,98 @@ class Client:
         else:
             self.BASE_PATH = base_path
 
-    async def __request(self, method: str, path: str) -> ClientResponse:
-        """Make a request."""
+        self.endpoints = [
+            Endpoint(
+                path,
+                CircuitBreaker(failure_threshold, reset_timeout),
+                Client.limiter(path, rate_limit, rate_limit_burst)
+            )
+            for path in (self.BASE_PATH, *fallback_paths)
+        ]
+
+    @classmethod
+    def limiter(cls, base_path: str, rate: float, capacity: float) -> TokenBucket:
+        """Token bucket shared by every client talking to base_path."""
+        limiter = cls._limiters.setdefault(base_path, TokenBucket(rate, capacity))
+        limiter.configure(rate, capacity)
+        return limiter
+
+    def _candidates(self) -> List[Endpoint]:
+        """Endpoints in priority order, with the ones behind an open circuit moved to the end."""
+        return sorted(self.endpoints, key=lambda endpoint: not endpoint.breaker.allow())
+
+    async def __request(self, method: str, path: str, raw: bool = False) -> ClientResponse:
+        """Make a request, hedging to the next endpoint when one is slow or failing."""
+        endpoints = self._candidates()
+        launched: Dict[asyncio.Future, Endpoint] = {}
+        pending = set()
+        error = None
+
+        try:
+            while True:
+                if len(launched) < len(endpoints):
+                    endpoint = endpoints[len(launched)]
+                    task = asyncio.ensure_future(self.__fetch(endpoint, method, path, raw))
+                    launched[task] = endpoint
+                    pending.add(task)
+                if not pending:
+                    raise error
+
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if len(launched) < len(endpoints) else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                errors = [task.exception() for task in done]
+                for task, exc in zip(done, errors):
+                    if exc is None:
+                        winner = endpoints.index(launched[task])
+                        for slower in pending:
+                            if endpoints.index(launched[slower]) < winner:
+                                launched[slower].breaker.record_failure()
+                        return task.result()
+                    error = exc
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def __fetch(self, endpoint: Endpoint, method: str, path: str, raw: bool):
+        attempt = 0
+        while True:
+            await endpoint.limiter.acquire()
+            try:
+                result = await self.__request_endpoint(endpoint, method, path, raw)
+            except ClientResponseError as exc:
+                delay = self.__retry_delay(exc, attempt)
+                if delay is None:
+                    endpoint.breaker.record_failure()
+                    raise
+                endpoint.limiter.pause(delay)
+                attempt += 1
+                continue
+            except (ClientError, asyncio.TimeoutError, ValueError):
+                endpoint.breaker.record_failure()
+                raise
+            endpoint.breaker.record_success()
+            return result
+
+    def __retry_delay(self, exc: ClientResponseError, attempt: int) -> Optional[float]:
+        """Delay before retrying a throttled request, or None when it should not be retried."""
+        if exc.status not in (429, 503) or attempt >= self.max_retries:
+            return None
+
+        delay = parse_retry_after(exc.headers or {})
+        if delay is None:
+            if exc.status != 429:
+                return None
+            backoff = Client.RETRY_BACKOFF * 2 ** attempt
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+
+        return delay if delay <= Client.MAX_RETRY_DELAY else None
+
+    async def __request_endpoint(self, endpoint: Endpoint, method: str, path: str, raw: bool) -> ClientResponse:
+        """Make a request, revalidating any cached body with the server."""
+        url = f"{endpoint.base_path}/{path}"
 
         headers = {
             "accept": "application/json"
@@ -30,23 +272,84 @@ class Client:
         if self.access_token is not None:
             headers["authorization"] = self.access_token
 
-        r = await self.session.request(
+        cached = self._cache.get(url)
+        if cached is not None:
+            if cached.etag is not None:
+                headers["if-none-match"] = cached.etag
+            if cached.last_modified is not None:
+                headers["if-modified-since"] = cached.last_modified
+
+        async with self.session.request(
             method,
-            f"{self.BASE_PATH}/{path}",
+            url,
             headers=headers,
             timeout=Client.REQUEST_TIMEOUT
-        )
-        r.raise_for_status()
-        return await r.json()
+        ) as r:
+            endpoint.limiter.observe(r.headers)
+            if r.status in (429, 503):
+                retry_after = parse_retry_after(r.headers)
+                if retry_after is not None:
+                    endpoint.limiter.pause(retry_after)
+            r.raise_for_status()
+
+            if r.status == 304 and cached is not None:
+                self.not_modified += 1
+                return cached.body if raw else json.loads(cached.body)
+
+            body = await r.read()
+            try:
+                # raw callers decode later, but a 2xx that is not JSON must still fail here so the endpoint
+                # is charged for it and the hedge moves on, e.g. a captive portal page
+                data = json.loads(body)
+            except ValueError as exc:
+                self._cache.pop(url, None)
+                raise ContentTypeError(
+                    r.request_info, r.history, status=r.status, message=f'Invalid JSON body: {exc}', headers=r.headers
+                )
+
+            etag, last_modified = r.headers.get("etag"), r.headers.get("last-modified")
+            if etag is not None or last_modified is not None:
+                self._cache[url] = CachedResponse(etag, last_modified, body)
+            else:
+                self._cache.pop(url, None)
+            return body if raw else data
 
-    async def get_alerts(self, region_id: str = None) -> ClientResponse:
+    async def get_alerts(self, region_id: str = None, raw: bool = False) -> ClientResponse:
         """Get alerts."""
-        return await self.__request("GET", "alerts" if region_id is None else f"alerts/{region_id}")
+        return await self.__request("GET", "alerts" if region_id is None else f"alerts/{region_id}", raw)
 
     async def get_last_alert_index(self) -> ClientResponse:
         """Get last alert index."""
         return await self.__request("GET", "alerts/status")
 
     async def get_regions(self) -> ClientResponse:
-        """Get regions."""
-        return await self.__request("GET", "regions")
+        """Get regions, served from the on-disk cache while it is fresh."""
+        loop = asyncio.get_running_loop()
+
+        if self.regions_cache_file is not None:
+            body = await loop.run_in_executor(None, self._read_regions_cache)
+            if body is not None:
+                return json.loads(body)
+
+        body = await self.__request("GET", "regions", raw=True)
+        regions = json.loads(body)
+
+        if self.regions_cache_file is not None:
+            await loop.run_in_executor(None, self._write_regions_cache, body)
+
+        return regions
+
+    def _read_regions_cache(self) -> Optional[bytes]:
+        try:
+            if time.time() - os.path.getmtime(self.regions_cache_file) > self.regions_cache_ttl:
+                return None
+            with open(self.regions_cache_file, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_regions_cache(self, body: bytes):
+        tmp_file_name = f'{self.regions_cache_file}.tmp'
+        with open(tmp_file_name, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_file_name, self.regions_cache_file)
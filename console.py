@@ -1,11 +1,30 @@
+import cProfile
+import multiprocessing
+import sys
+
 import core
 import logs
 import funcs
+import workers
+
+PROFILE_FILE = 'profile.pstats'
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     core.init()
+    profiler = cProfile.Profile() if '--profile' in sys.argv else None
+    if profiler is not None:
+        profiler.enable()
+
     logs.logger.info("Mainloop enter")
     try:
         core.loop.run_until_complete(funcs.mainloop())
     finally:
+        core.loop.run_until_complete(core.EventHandler.join())
+        core.loop.run_until_complete(core.Session.close())
+        workers.WorkerPool.close()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(PROFILE_FILE)
+            logs.logger.info(f"Profile written to {PROFILE_FILE}")
         logs.logger.info("Mainloop exit")
@@ -1,71 +1,263 @@
 import asyncio
+import os
 import sys
+import time
 from types import coroutine
-from typing import Dict, List
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
 
+import aiohttp
 import pydantic
 
 import core
 import exceptions
+import executor
+import journal
 import logs
+import metrics
 import models
 import utils
+import workers
+from client import Client
 from logs import logger
 
 loop = asyncio.new_event_loop()
 
 
+class Subscriber:
+    """Runs a callback from its own bounded queue on dedicated worker tasks."""
+
+    QUEUE_SIZE = 100
+
+    def __init__(
+            self, callback: callable, event_type: models.EventType, concurrency: int = 1,
+            routes: Iterable[Hashable] = None, gate: Callable[[], bool] = None
+    ):
+        self.callback = callback
+        self.event_type = event_type
+        self.routes = None if routes is None else frozenset(routes)
+        self.gate = gate
+        self.lane = EventHandler.LANES.get(event_type, EventHandler.LOW_PRIORITY_LANE)
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = None
+        self.workers: List[asyncio.Task] = []
+        self.dispatched = 0
+        self.dropped = 0
+        self.gated = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._loop: asyncio.AbstractEventLoop = None
+
+    @property
+    def name(self) -> str:
+        return getattr(self.callback, '__qualname__', repr(self.callback))
+
+    @property
+    def overflow_policy(self) -> models.OverflowPolicy:
+        if self.event_type == models.EventType.alert or Config() is None:
+            return models.OverflowPolicy.block
+        return Config().event_overflow_policy
+
+    def _start(self):
+        running_loop = asyncio.get_running_loop()
+        if self._loop is running_loop:
+            return
+        self._loop = running_loop
+        self.queue = asyncio.Queue(Config().event_queue_size if Config() is not None else Subscriber.QUEUE_SIZE)
+        self.workers = [running_loop.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def put(self, event: models.Event):
+        self._start()
+        item = (self._loop.time(), event)
+
+        if self.queue.full():
+            policy = self.overflow_policy
+            if policy == models.OverflowPolicy.drop_newest:
+                self.dropped += 1
+                return
+            if policy == models.OverflowPolicy.drop_oldest:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+
+        await self.queue.put(item)
+
+    async def _work(self):
+        while True:
+            enqueued, event = await self.queue.get()
+            try:
+                await EventHandler.yield_to_higher_lanes(self.lane)
+
+                latency = self._loop.time() - enqueued
+                self.dispatched += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+                metrics.Metrics.observe('dispatch_seconds', latency, event_type=self.event_type.value)
+
+                await self.callback(event)
+            except Exception as exc:
+                logger.exception(exc)
+            finally:
+                self.queue.task_done()
+
+    async def join(self):
+        if self.queue is not None and self._loop is asyncio.get_running_loop():
+            await self.queue.join()
+
+    async def close(self):
+        await self.join()
+        for worker in self.workers:
+            worker.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            'name': self.name,
+            'event_type': self.event_type.value,
+            'depth': self.queue.qsize() if self.queue is not None else 0,
+            'dispatched': self.dispatched,
+            'dropped': self.dropped,
+            'gated': self.gated,
+            'latency_avg': self.latency_total / self.dispatched if self.dispatched else 0.0,
+            'latency_max': self.latency_max,
+        }
+
+
 class EventHandler:
-    _callbacks: Dict[models.EventType, List[callable]] = {
+    HIGH_PRIORITY_LANE = 0
+    LOW_PRIORITY_LANE = 1
+    LANES: Dict[models.EventType, int] = {
+        models.EventType.alert: HIGH_PRIORITY_LANE,
+    }
+
+    _callbacks: Dict[models.EventType, List[Subscriber]] = {
         event_type: list() for event_type in models.EventType
     }
+    _broadcast: Dict[models.EventType, List[Subscriber]] = {
+        event_type: list() for event_type in models.EventType
+    }
+    _routes: Dict[models.EventType, Dict[Hashable, List[Subscriber]]] = {
+        event_type: dict() for event_type in models.EventType
+    }
+    _closing: set = set()
 
     def __new__(cls, *args, **kwargs):
         raise NotImplementedError()
 
     @classmethod
-    def register_callback(cls, callback, event_type: models.EventType):
-        cls._callbacks[event_type].append(callback)
+    def register_callback(
+            cls, callback, event_type: models.EventType, concurrency: int = 1,
+            routes: Iterable[Hashable] = None, gate: Callable[[], bool] = None
+    ):
+        """Subscribe callback to event_type; with routes it only receives events whose route is listed."""
+        subscriber = Subscriber(callback, event_type, concurrency, routes, gate)
+        cls._callbacks[event_type].append(subscriber)
+
+        if subscriber.routes is None:
+            cls._broadcast[event_type].append(subscriber)
+        else:
+            for route in subscriber.routes:
+                cls._routes[event_type].setdefault(route, []).append(subscriber)
+
+    @classmethod
+    def unregister_callback(cls, callback, event_type: models.EventType):
+        for subscriber in [s for s in cls._callbacks[event_type] if s.callback == callback]:
+            cls._callbacks[event_type].remove(subscriber)
+
+            if subscriber.routes is None:
+                cls._broadcast[event_type].remove(subscriber)
+            else:
+                for route in subscriber.routes:
+                    cls._routes[event_type][route].remove(subscriber)
+                    if not cls._routes[event_type][route]:
+                        del cls._routes[event_type][route]
+
+            cls._close_subscriber(subscriber)
+
+    @classmethod
+    def _close_subscriber(cls, subscriber: Subscriber):
+        if subscriber.workers and not subscriber._loop.is_closed():
+            task = subscriber._loop.create_task(subscriber.close())
+            cls._closing.add(task)
+            task.add_done_callback(cls._closing.discard)
 
     @classmethod
     def clear_callbacks(cls, event_type: models.EventType = None):
-        if event_type is None:
-            cls._callbacks = {
-                event_type: list() for event_type in models.EventType
-            }
-        else:
+        event_types = list(models.EventType) if event_type is None else [event_type]
+        for event_type in event_types:
+            for subscriber in cls._callbacks[event_type]:
+                cls._close_subscriber(subscriber)
             cls._callbacks[event_type] = list()
+            cls._broadcast[event_type] = list()
+            cls._routes[event_type] = dict()
 
     @classmethod
     def register_callback_dec(cls, event_type: models.EventType):
         def wrapper(callback):
             cls.register_callback(callback, event_type)
+            return callback
 
         return wrapper
 
     @classmethod
     async def call(cls, event: models.Event):
-        await asyncio.gather(
-            *(
-                callback(event)
-                for callback in cls._callbacks[event.type]
-            )
-        )
+        for subscriber in (*cls._broadcast[event.type], *cls._routes[event.type].get(event.route, ())):
+            if subscriber.gate is None or subscriber.gate():
+                await subscriber.put(event)
+            else:
+                subscriber.gated += 1
+
+    @classmethod
+    async def join(cls):
+        for subscribers in list(cls._callbacks.values()):
+            for subscriber in subscribers:
+                await subscriber.join()
+        if cls._closing:
+            await asyncio.gather(*cls._closing, return_exceptions=True)
+
+    @classmethod
+    async def yield_to_higher_lanes(cls, lane: int):
+        """Let workers of higher lanes that are ready now run first.
+
+        This only orders dispatch: a busy or backlogged alert action never holds up status subscribers.
+        """
+        for _ in range(lane):
+            await asyncio.sleep(0)
+
+    @classmethod
+    def stats(cls) -> List[Dict]:
+        return [
+            subscriber.stats()
+            for subscribers in cls._callbacks.values()
+            for subscriber in subscribers
+        ]
 
 
 class Config:
     _conf: models.ConfigModel = None
+    _file_name: str = 'conf.json'
+    _mtime: float = None
+    _action_callbacks: Dict[Tuple[str, bool, str, int], callable] = {}
+    # read once by mainloop/create_source, so the running source, fan-out server and metrics dumper keep the old values
+    RESTART_FIELDS = (
+        'stream_url', 'stream_type', 'replay_file', 'replay_speed', 'replay_outputs',
+        'fanout_host', 'fanout_port', 'metrics_file', 'metrics_interval',
+    )
 
     def __new__(cls) -> models.ConfigModel:
         return cls._conf
 
+    @staticmethod
+    def _read(file_name: str) -> models.ConfigModel:
+        with open(file_name, 'r', encoding='utf-8') as f:
+            return models.ConfigModel.model_validate_json(f.read())
+
     @classmethod
     def load(cls, file_name: str = None):
         file_name = file_name or 'conf.json'
+        cls._file_name = file_name
         try:
-            with open(file_name, 'r', encoding='utf-8') as f:
-                cls._conf = models.ConfigModel.parse_raw(f.read())
-                cls.register_config_actions()
+            cls._mtime = os.path.getmtime(file_name)
+            cls._conf = cls._read(file_name)
+            cls.register_config_actions()
 
         except FileNotFoundError as err:
             logger.error("Config file not found! Generating template.")
@@ -78,6 +270,43 @@ class Config:
             raise exc
         logger.debug("Loaded successfully")
 
+    @classmethod
+    async def reload(cls) -> bool:
+        """Load the config file again if it changed; the running config is kept if the new one is invalid."""
+        try:
+            mtime = os.path.getmtime(cls._file_name)
+        except OSError:
+            return False
+        if mtime == cls._mtime:
+            return False
+        cls._mtime = mtime
+
+        started = time.perf_counter()
+        try:
+            conf = await asyncio.get_running_loop().run_in_executor(None, cls._read, cls._file_name)
+        except (OSError, ValueError) as exc:
+            logger.error(f"Config reload failed, keeping the current config: {exc}")
+            return False
+
+        previous, cls._conf = cls._conf, conf
+        cls.register_config_actions()
+        cls.start_action_workers()
+        Session.config_changed(previous, conf)
+        restart_fields = [field for field in cls.RESTART_FIELDS if getattr(previous, field) != getattr(conf, field)]
+        if restart_fields:
+            logger.warning(f"Config changes take effect after a restart: {', '.join(restart_fields)}")
+
+        elapsed = time.perf_counter() - started
+        metrics.Metrics.observe('config_reload_seconds', elapsed)
+        logger.info(f"Config reloaded in {elapsed * 1000:.1f} ms")
+        return True
+
+    @classmethod
+    async def watch(cls):
+        while cls._conf.config_watch_interval:
+            await asyncio.sleep(cls._conf.config_watch_interval)
+            await cls.reload()
+
     @classmethod
     def save(cls, file_name: str = None):
         file_name = file_name or 'conf.json'
@@ -85,31 +314,205 @@ class Config:
             f.write(cls._conf.model_dump_json())
 
     @classmethod
-    def register_action(cls, action: models.Action):
-        async def callback(event):
-            await try_job(
-                action.act(event),
+    def register_action(cls, action: models.Action, region_id: str, stub: bool = False) -> callable:
+        async def callback(event: models.AlertEvent):
+            if stub:
+                logger.info(f'Alert action({action.type}) stubbed: {event.alert_type.value} {event.alert.type.value}')
+                return
+
+            failure = {}
+            started = time.perf_counter()
+            success = await try_job(
+                workers.WorkerPool.run(action, event) if action.isolated else
+                executor.run_action(action.act(event), action.timeout),
                 exceptions.EventActionException,
+                success_callback=log_action_result,
+                fail_callback=failure.update,
                 log_func=logger.info,
                 success_log=f'Alert action({action.type}) Finished',
                 fail_log=f'Alert action({action.type}) Failed:'
             )
 
-        EventHandler.register_callback(callback, models.EventType.alert)
+            metrics.Metrics.observe(
+                'action_seconds', time.perf_counter() - started,
+                action=action.type.value, result='success' if success else 'failure'
+            )
+            if success and event.alert_type == models.AlertEventType.start:
+                metrics.Metrics.observe(
+                    'alert_to_action_seconds', time.time() - event.alert.lastUpdate.timestamp(),
+                    action=action.type.value
+                )
+
+            if Config().journal_enabled and not Config().rehearsal:
+                journal.Journal.record_action(
+                    event, action.type, success, str(failure['exception']) if 'exception' in failure else None
+                )
+
+        EventHandler.register_callback(
+            callback, models.EventType.alert, action.max_concurrency,
+            routes=[(region_id, alert_type, event_type) for alert_type, event_type in action.routes()],
+            gate=action.is_active
+        )
+        return callback
 
     @classmethod
     def register_config_actions(cls):
-        EventHandler.clear_callbacks(models.EventType.alert)
+        """Sync action subscribers with the config.
+
+        Unchanged actions keep their subscriber, so events in flight on it still count against max_concurrency
+        after a reload; only removed or changed actions are unsubscribed.
+        While replaying a recording, actions only log their events unless replay_actions is set.
+        """
+        stub = cls._conf.replay_file is not None and not cls._conf.replay_actions
+        keys, seen = [], {}
+        for region in cls._conf.watched_regions:
+            for action in region.actions:
+                config = (region.regionId, stub, action.model_dump_json())
+                seen[config] = seen.get(config, -1) + 1  # identical duplicates each keep their own subscriber
+                keys.append(((*config, seen[config]), action))
+
+        for key in set(cls._action_callbacks) - {key for key, _ in keys}:
+            EventHandler.unregister_callback(cls._action_callbacks.pop(key), models.EventType.alert)
+
+        for key, action in keys:
+            if key not in cls._action_callbacks:
+                cls._action_callbacks[key] = cls.register_action(action, key[0], stub)
+                if not stub:
+                    action.warm_up()
+
+    @classmethod
+    def start_action_workers(cls):
+        """Spawn the worker pool when an isolated action is configured; only the mainloop needs it."""
+        if cls._conf.replay_file is not None and not cls._conf.replay_actions:
+            return
+        if any(action.isolated for region in cls._conf.watched_regions for action in region.actions):
+            workers.WorkerPool.start(cls._conf.action_workers)
+
+
+class Session:
+    REGIONS_CACHE_FILE = 'regions.json'
+    CLIENT_FIELDS = (
+        'api_key', 'api_base_url', 'api_base_urls', 'regions_cache_ttl', 'hedge_delay',
+        'circuit_breaker_threshold', 'circuit_breaker_reset_timeout',
+        'rate_limit_per_minute', 'rate_limit_burst', 'max_retries',
+    )
+    CONNECTOR_FIELDS = ('enable_ssl_validation', 'keepalive_timeout', 'dns_cache_ttl')
+
+    _session: aiohttp.ClientSession = None
+    _client: Client = None
+    _loop: asyncio.AbstractEventLoop = None
+    _stats: Dict[str, int] = {'created': 0, 'reused': 0}
+
+    def __new__(cls) -> aiohttp.ClientSession:
+        return cls.get()
+
+    @classmethod
+    def get(cls) -> aiohttp.ClientSession:
+        running_loop = asyncio.get_running_loop()
+        if cls._session is None or cls._session.closed or cls._loop is not running_loop:
+            conf = Config()
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(cls._on_connection_create)
+            trace_config.on_connection_reuseconn.append(cls._on_connection_reuse)
+
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    ssl=conf.enable_ssl_validation,
+                    keepalive_timeout=conf.keepalive_timeout,
+                    ttl_dns_cache=conf.dns_cache_ttl,
+                ),
+                trace_configs=[trace_config]
+            )
+            cls._client = None
+            cls._loop = running_loop
+            logger.debug("HTTP session opened")
+        return cls._session
+
+    @classmethod
+    def client(cls) -> Client:
+        session = cls.get()
+        if cls._client is None:
+            conf = Config()
+            base_urls = conf.api_base_urls or [conf.api_base_url]
+            cls._client = Client(
+                session, conf.api_key, base_urls[0],
+                regions_cache_file=Session.REGIONS_CACHE_FILE,
+                regions_cache_ttl=conf.regions_cache_ttl,
+                fallback_paths=base_urls[1:],
+                hedge_delay=conf.hedge_delay,
+                failure_threshold=conf.circuit_breaker_threshold,
+                reset_timeout=conf.circuit_breaker_reset_timeout,
+                rate_limit=conf.rate_limit_per_minute / 60,
+                rate_limit_burst=conf.rate_limit_burst,
+                max_retries=conf.max_retries
+            )
+        return cls._client
+
+    @classmethod
+    def config_changed(cls, previous: models.ConfigModel, conf: models.ConfigModel):
+        """Rebuild the client on the open session when its settings change, keeping pooled connections."""
+        if any(getattr(previous, field) != getattr(conf, field) for field in Session.CLIENT_FIELDS):
+            cls._client = None
+        if any(getattr(previous, field) != getattr(conf, field) for field in Session.CONNECTOR_FIELDS):
+            logger.warning("Connection settings changed; they take effect after a restart")
+
+    @classmethod
+    async def close(cls):
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+            logger.debug("HTTP session closed %s", cls.stats())
+        cls._session = None
+        cls._client = None
+        cls._loop = None
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        total = cls._stats['created'] + cls._stats['reused']
+        return {
+            **cls._stats,
+            'not_modified': cls._client.not_modified if cls._client is not None else 0,
+            'reuse_ratio': cls._stats['reused'] / total if total else 0.0
+        }
+
+    @classmethod
+    async def _on_connection_create(cls, session, context, params):
+        cls._stats['created'] += 1
 
-        for action in cls._conf.actions:
-            cls.register_action(action)
+    @classmethod
+    async def _on_connection_reuse(cls, session, context, params):
+        cls._stats['reused'] += 1
 
 
 class Status:
-    def __init__(self):
+    FILE_NAME = 'status.json'
+    SAVE_DELAY = 2
+
+    _instance: 'Status' = None
+
+    def __new__(cls) -> 'Status':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.load()
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        cls._instance = None
+
+    def load(self):
+        self._dirty = False
+        self._pending: asyncio.Task = None
+        self._lock = asyncio.Lock()
+        # a rehearsal starts from an empty status and never writes it, so live state is not touched
+        self.persistent = not Config().rehearsal
+        if not self.persistent:
+            logger.info("Replaying: status is kept in memory only")
+            self.model = models.StatusModel()
+            return
+
         logger.debug("Loading status file")
         try:
-            with open('status.json', 'r', encoding='utf-8') as f:
+            with open(Status.FILE_NAME, 'r', encoding='utf-8') as f:
                 self.model = models.StatusModel.parse_raw(f.read())
         except (FileNotFoundError, pydantic.ValidationError) as exc:
             logger.exception(exc)
@@ -117,9 +520,55 @@ class Status:
             self.model = models.StatusModel()
 
     def save(self):
-        logger.debug("Saving status file")
-        with open('status.json', 'w', encoding='utf-8') as f:
-            f.write(self.model.model_dump_json())
+        self._dirty = True
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(Status.SAVE_DELAY)
+        if self._dirty:
+            await self.flush()
+
+    async def flush(self):
+        self._dirty = False
+        if not self.persistent:
+            return
+        data = self.model.model_dump_json()
+        async with self._lock:
+            logger.debug("Saving status file")
+            await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+
+    async def close(self):
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self._dirty:
+            await self.flush()
+
+    @staticmethod
+    def _write(data: str):
+        tmp_file_name = f'{Status.FILE_NAME}.tmp'
+        with open(tmp_file_name, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file_name, Status.FILE_NAME)
+
+
+metrics.Metrics.register_gauges('session', Session.stats)
+metrics.Metrics.register_gauges('events', lambda: {
+    key: sum(stats[key] for stats in EventHandler.stats())
+    for key in ('depth', 'dispatched', 'dropped', 'gated')
+})
+
+
+def log_action_result(result):
+    if isinstance(result, executor.CommandResult):
+        logger.debug('Command finished with code %s: %s\n[stdout]\n%s[stderr]\n%s',
+                     result.returncode, result.command, result.stdout, result.stderr)
+    elif isinstance(result, executor.CopyResult):
+        logger.info(f'Copied {result.source} -> {result.destination} '
+                    f'({result.size} bytes) in {result.elapsed * 1000:.1f} ms')
 
 
 async def try_job(
@@ -173,8 +622,8 @@ async def try_job(
 def init():
     if '-c' in sys.argv:
         utils.console_command(*sys.argv[sys.argv.index('-c') + 1:])
-        return
-    logs.init_logger(('--debug' in sys.argv or '-d' in sys.argv))
+        sys.exit()
+    logs.init_logger(('--debug' in sys.argv or '-d' in sys.argv), '--log-json' in sys.argv)
     logs.logger.info("Starting")
     core.Config.load()
 
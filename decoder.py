@@ -0,0 +1,53 @@
+import json
+from typing import List, Dict, Tuple, Union
+
+from pydantic import TypeAdapter
+
+import models
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+REGIONS_ADAPTER = TypeAdapter(List[models.Region])
+
+
+def loads(payload: Union[bytes, str]):
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+class RegionDecoder:
+    """Decodes alerts payloads, reusing validated regions whose lastUpdate has not changed."""
+
+    def __init__(self):
+        self._cache: Dict[str, Tuple[str, models.Region]] = {}
+
+    def decode(self, payload, fast: bool = True) -> List[models.Region]:
+        if isinstance(payload, (bytes, str)):
+            payload = loads(payload)
+
+        if not fast or not isinstance(payload, list):
+            return REGIONS_ADAPTER.validate_python(payload)
+
+        regions: List[models.Region] = [None] * len(payload)
+        missed = []
+        for i, raw in enumerate(payload):
+            if isinstance(raw, dict):
+                cached = self._cache.get(raw.get('regionId'))
+                if cached is not None and cached[0] == raw.get('lastUpdate'):
+                    regions[i] = cached[1]
+                    continue
+            missed.append(i)
+
+        if missed:
+            for i, region in zip(missed, REGIONS_ADAPTER.validate_python([payload[i] for i in missed])):
+                regions[i] = region
+
+        self._cache = {
+            region.regionId: (raw['lastUpdate'], region)
+            for raw, region in zip(payload, regions)
+        }
+        return regions
@@ -0,0 +1,34 @@
+from typing import Dict, Iterable, List, NamedTuple
+
+import models
+
+
+class AlertDiff(NamedTuple):
+    start: List[models.Alert]
+    end: List[models.Alert]
+    updated: List[models.Alert]
+
+
+def index_alerts(alerts: Iterable[models.Alert]) -> Dict[models.AlertKey, models.Alert]:
+    return {alert.key: alert for alert in alerts}
+
+
+def diff_alerts(previous: Iterable[models.Alert], current: Iterable[models.Alert]) -> AlertDiff:
+    """Diff two alert collections by (regionId, type) in linear time.
+
+    Works the same for a single region's alerts or for alerts of every region at once.
+    """
+    previous = index_alerts(previous)
+    current = index_alerts(current)
+
+    start, updated = [], []
+    for key, alert in current.items():
+        old = previous.get(key)
+        if old is None:
+            start.append(alert)
+        elif old.lastUpdate != alert.lastUpdate:
+            updated.append(alert)
+
+    end = [alert for key, alert in previous.items() if key not in current]
+
+    return AlertDiff(start=start, end=end, updated=updated)
@@ -17,3 +17,19 @@ class OutOfTimeTableException(EventActionException):
 
 class WinWindowNotFoundException(EventActionException):
     pass
+
+
+class ActionTimeoutException(EventActionException):
+    pass
+
+
+class ActionCommandException(EventActionException):
+    pass
+
+
+class ActionCopyException(EventActionException):
+    pass
+
+
+class ActionWorkerException(EventActionException):
+    pass
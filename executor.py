@@ -0,0 +1,168 @@
+import asyncio
+import errno
+import importlib
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from typing import NamedTuple, Union, Sequence, Iterable
+
+import exceptions
+from logs import logger
+
+
+class CommandResult(NamedTuple):
+    command: str
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+class CopyResult(NamedTuple):
+    source: str
+    destination: str
+    size: int
+    elapsed: float
+
+
+async def run_action(job, timeout: float = None):
+    try:
+        return await asyncio.wait_for(job, timeout)
+    except asyncio.TimeoutError:
+        raise exceptions.ActionTimeoutException(f'timed out after {timeout}s')
+
+
+def _kill(process: asyncio.subprocess.Process):
+    if process.returncode is not None:
+        return
+    if sys.platform == "win32":
+        process.kill()
+    else:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def run_command(command: Union[str, Sequence[str]], timeout: float = None) -> CommandResult:
+    """Run a shell command (or an argument list) without blocking the loop and capture its output."""
+    kwargs = dict(stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    if sys.platform != "win32":
+        kwargs['start_new_session'] = True
+
+    if isinstance(command, str):
+        process = await asyncio.create_subprocess_shell(command, **kwargs)
+    else:
+        process = await asyncio.create_subprocess_exec(*command, **kwargs)
+        command = ' '.join(command)
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        _kill(process)
+        await process.wait()
+        raise exceptions.ActionTimeoutException(f'Command timed out after {timeout}s: {command}')
+    except asyncio.CancelledError:
+        _kill(process)
+        await process.wait()
+        raise
+
+    result = CommandResult(
+        command=command,
+        returncode=process.returncode,
+        stdout=stdout.decode(errors='replace'),
+        stderr=stderr.decode(errors='replace'),
+    )
+    if result.returncode != 0:
+        raise exceptions.ActionCommandException(
+            f'Command exited with code {result.returncode}: {command}\n[stderr]\n{result.stderr}'
+        )
+    return result
+
+
+_FAST_COPY_ERRNOS = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def _copy_contents(src, dst, size: int):
+    for copy_func in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if copy_func is None:
+            continue
+
+        copied = 0
+        try:
+            while copied < size:
+                if copy_func is os.sendfile:
+                    count = os.sendfile(dst.fileno(), src.fileno(), copied, size - copied)
+                else:
+                    count = os.copy_file_range(src.fileno(), dst.fileno(), size - copied, copied, copied)
+                if count == 0:
+                    break
+                copied += count
+            return
+        except OSError as exc:
+            if copied or exc.errno not in _FAST_COPY_ERRNOS:
+                raise
+
+    shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _copy_file(source: str, destination_folder: str) -> CopyResult:
+    started = time.perf_counter()
+    destination = os.path.join(destination_folder, os.path.basename(source))
+
+    fd, tmp_file_name = tempfile.mkstemp(dir=destination_folder, prefix='.', suffix='.tmp')
+    try:
+        with open(source, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+            size = os.fstat(src.fileno()).st_size
+            _copy_contents(src, dst, size)
+        shutil.copymode(source, tmp_file_name)
+        os.replace(tmp_file_name, destination)
+    except BaseException:
+        if os.path.exists(tmp_file_name):
+            os.remove(tmp_file_name)
+        raise
+
+    return CopyResult(source, destination, size, time.perf_counter() - started)
+
+
+async def copy_file(source: str, destination_folder: str) -> CopyResult:
+    """Copy a file into a folder using kernel zero-copy where available and an atomic rename."""
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, _copy_file, source, destination_folder)
+    except OSError as exc:
+        raise exceptions.ActionCopyException(f'{source} -> {destination_folder}: {exc}')
+
+
+def _prewarm_file(file_name: str):
+    with open(file_name, 'rb') as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while f.read(1024 * 1024):
+                pass
+
+
+def prewarm_files(file_names: Iterable[str]):
+    """Pull files into the page cache from a background thread."""
+
+    def warm_up():
+        for file_name in file_names:
+            try:
+                _prewarm_file(file_name)
+            except OSError:
+                pass
+
+    threading.Thread(target=warm_up, name='prewarm', daemon=True).start()
+
+
+def preload_modules(module_names: Iterable[str]):
+    """Import slow action backends from a background thread so the first alert does not wait for them."""
+
+    def warm_up():
+        for module_name in module_names:
+            try:
+                importlib.import_module(module_name)
+            except Exception as exc:
+                logger.warning(f'Preloading {module_name} failed: {exc!r}')
+
+    threading.Thread(target=warm_up, name='preload', daemon=True).start()
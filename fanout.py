@@ -0,0 +1,88 @@
+from typing import List, Dict, Tuple
+
+from aiohttp import web
+
+import core
+import metrics
+import models
+from logs import logger
+from streaming import StreamHub, versioned_json_response
+
+
+class FanoutServer:
+    """Serves the upstream alerts payload and alert transitions to other radio_alarm instances on the LAN.
+
+    Downstream instances use http://host:port/api/v3 as api_base_url,
+    or http://host:port/api/v3/alerts/stream (or /alerts/ws) as stream_url.
+    """
+
+    BASE_PATH = "/api/v3"
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.regions: List[Dict] = []
+        self.index = 0
+        self._version: Tuple = ()
+        self.hub = StreamHub(lambda: self.regions)
+        self.transitions = StreamHub()
+        self._runner: web.AppRunner = None
+
+        self.app = web.Application()
+        self.app.router.add_get(f"{FanoutServer.BASE_PATH}/alerts", self.alerts)
+        self.app.router.add_get(f"{FanoutServer.BASE_PATH}/alerts/status", self.alert_index)
+        self.app.router.add_get(f"{FanoutServer.BASE_PATH}/alerts/stream", self.hub.sse_handler)
+        self.app.router.add_get(f"{FanoutServer.BASE_PATH}/alerts/ws", self.hub.ws_handler)
+        self.app.router.add_get(f"{FanoutServer.BASE_PATH}/alerts/{{regionId}}", self.region_alerts)
+        self.app.router.add_get("/status", self.status)
+        self.app.router.add_get("/metrics", self.metrics_text)
+        self.app.router.add_get("/transitions/stream", self.transitions.sse_handler)
+        self.app.router.add_get("/transitions/ws", self.transitions.ws_handler)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+
+        core.EventHandler.register_callback(self.on_status_receive, models.EventType.status_receive)
+        core.EventHandler.register_callback(self.on_alert, models.EventType.alert)
+        logger.info(f"Fan-out server listening on http://{self.host}:{self.port}{FanoutServer.BASE_PATH}")
+
+    async def stop(self):
+        core.EventHandler.unregister_callback(self.on_status_receive, models.EventType.status_receive)
+        core.EventHandler.unregister_callback(self.on_alert, models.EventType.alert)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def on_status_receive(self, event: models.StatusReceivedEvent):
+        version = tuple((region.regionId, region.lastUpdate) for region in event.regions)
+        if version == self._version:
+            return
+
+        self._version = version
+        self.regions = [region.model_dump(mode='json') for region in event.regions]
+        self.index += 1
+        self.hub.publish(self.regions)
+
+    async def on_alert(self, event: models.AlertEvent):
+        self.transitions.publish(event.model_dump(mode='json'))
+
+    async def alerts(self, request: web.Request) -> web.Response:
+        return versioned_json_response(request, self.regions, self.index)
+
+    async def region_alerts(self, request: web.Request) -> web.Response:
+        region_id = request.match_info['regionId']
+        return versioned_json_response(
+            request, [region for region in self.regions if region['regionId'] == region_id], self.index
+        )
+
+    async def alert_index(self, request: web.Request) -> web.Response:
+        return web.json_response({"lastActionIndex": self.index})
+
+    async def status(self, request: web.Request) -> web.Response:
+        return web.json_response(text=core.Status().model.model_dump_json())
+
+    async def metrics_text(self, request: web.Request) -> web.Response:
+        return web.Response(text=metrics.Metrics.render(), content_type='text/plain', charset='utf-8')
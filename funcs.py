@@ -1,16 +1,26 @@
 import asyncio
 import datetime
+import logging
 
 import aiohttp
 import pydantic
-from pydantic import TypeAdapter
-from typing import List
+from typing import List, Optional
 
 import core
+import decoder
+import diff
+import journal
+import metrics
+import recording
 import models
-from client import Client
+import sources
+import transitions
 from logs import logger
 
+_last_alert_index: Optional[int] = None
+_last_failure: models.PollOutcome = models.PollOutcome.failed
+_decoder = decoder.RegionDecoder()
+
 
 async def alarm_trigger(event: models.AlertEvent, silent: bool = False):
     logger.info(f'Alert action enter: {event}')
@@ -18,83 +28,238 @@ async def alarm_trigger(event: models.AlertEvent, silent: bool = False):
     if silent:
         logger.info(f'Alert action silent(forced)')
 
-    if core.Config().reginId != event.alert.regionId:
+    if event.alert.regionId not in core.Config().region_ids:
         logger.info(f'Alert action silent(wrong regionId)')
         return
 
+    metrics.Metrics.inc('alert_events_total', alert_type=event.alert.type.value, event_type=event.alert_type.value)
+    if core.Config().journal_enabled and not core.Config().rehearsal:
+        journal.Journal.record_alert(event)
+
     await core.EventHandler.call(event)
 
     logger.info(f'Alert action exit')
 
 
+async def release_end(event: models.AlertEvent):
+    """Fire an end the TransitionFilter held back and drop it from the persisted pending ends."""
+    status = core.Status()
+    status.model.pendingEnds = _transitions.held()
+    await alarm_trigger(event)
+    await status.flush()
+
+
+async def resume_pending_ends(status: core.Status):
+    """Settle ends that were still held back when the previous run stopped."""
+    active = {alert.key for region_status in status.model.regions.values() for alert in region_status.activeAlerts}
+    for alert in status.model.pendingEnds:
+        if alert.key in active:
+            logger.info(f'Alert flap suppressed across restart [{alert.regionId}] {alert.type.value}')
+        else:
+            await alarm_trigger(models.AlertEvent(alert=alert, alert_type=models.AlertEventType.end))
+    status.model.pendingEnds = []
+
+
+_transitions = transitions.TransitionFilter(alarm_trigger, release_end)
+
+
+async def receive_status(response) -> Optional[List[models.Region]]:
+    conf = core.Config()
+    if conf.record_file is not None and not conf.rehearsal:
+        await recording.record(conf.record_file, response)
+
+    try:
+        with metrics.Metrics.time('parse_seconds'):
+            regions = _decoder.decode(response, core.Config().fast_decode)
+    except (pydantic.ValidationError, ValueError) as exc:
+        record_failure(exc)
+        return
+
+    await core.EventHandler.call(models.StatusReceivedEvent(regions=regions))
+
+    return regions
+
+
 async def request_status():
     try:
-        logger.debug(f'Status check {datetime.datetime.now()}')
-        async with aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(ssl=core.Config().enable_ssl_validation)
-        ) as session:
-            response = await Client(session, core.Config().api_key, core.Config().api_base_url).get_alerts(
-                core.Config().reginId)
-        logger.debug(f'Packet received: {response}')
+        logger.debug('Status check %s', datetime.datetime.now())
+        region_ids = core.Config().region_ids
+        single_region = len(region_ids) == 1 and core.Config().fanout_port is None
+        with metrics.Metrics.time('request_seconds', path='alerts'):
+            response = await core.Session.client().get_alerts(region_ids[0] if single_region else None, raw=True)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Packet received: %s', response)
+            logger.debug('Connection stats: %s', core.Session.stats())
+    except (aiohttp.ClientError, TimeoutError) as exc:
+        record_failure(exc)
+        return
 
-        regions = TypeAdapter(List[models.Region]).validate_python(response)
+    return await receive_status(response)
 
-        await core.EventHandler.call(models.StatusReceivedEvent(regions=regions))
 
-        return regions
+async def request_alert_index() -> Optional[int]:
+    try:
+        with metrics.Metrics.time('request_seconds', path='alerts/status'):
+            response = await core.Session.client().get_last_alert_index()
+        logger.debug('Alert index received: %s', response)
+        return models.AlertIndex.model_validate(response).lastActionIndex
     except (aiohttp.ClientError, TimeoutError, pydantic.ValidationError) as exc:
-        logger.exception(exc)
+        record_failure(exc)
         return
 
 
-async def periodic_check_alarm(is_start: bool = False):
+def record_failure(exc: Exception):
+    global _last_failure
+
+    logger.exception(exc)
+    if isinstance(exc, aiohttp.ClientResponseError) and exc.status == 429:
+        _last_failure = models.PollOutcome.rate_limited
+    else:
+        _last_failure = models.PollOutcome.failed
+    metrics.Metrics.inc('poll_failures_total', outcome=_last_failure.value)
+
+
+async def periodic_check_alarm(is_start: bool = False) -> models.PollOutcome:
+    global _last_alert_index
+
+    index = None
+    if core.Config().poll_mode == models.PollMode.index:
+        index = await request_alert_index()
+        if not is_start and index is not None and index == _last_alert_index:
+            return models.PollOutcome.unchanged
+
     regions = await request_status()
     if regions is None:
-        return
+        return _last_failure
+
+    index_changed = index is not None and index != _last_alert_index
+    if index is not None:
+        _last_alert_index = index
 
+    if await check_alarm(regions, is_start) or index_changed:
+        return models.PollOutcome.changed
+    return models.PollOutcome.unchanged
+
+
+async def check_alarm(regions: List[models.Region], is_start: bool = False) -> bool:
     status = core.Status()
+    received = {region.regionId: region for region in regions}
+    changed = False
+    transitioned = False
+
+    # regions dropped from the config (at restart or by a reload) must not keep their alerts active
+    region_ids = core.Config().region_ids
+    watched = set(region_ids)
+    for region_id in [region_id for region_id in status.model.regions if region_id not in watched]:
+        logger.info(f'Region no longer watched, dropping its status [{region_id}]')
+        del status.model.regions[region_id]
+        changed = True
+    pending_ends = [alert for alert in status.model.pendingEnds if alert.regionId in watched]
+    if len(pending_ends) != len(status.model.pendingEnds):
+        status.model.pendingEnds = pending_ends
+        changed = True
+
+    for region_id in region_ids:
+        region_status = status.model.regions.setdefault(region_id, models.RegionStatusModel())
+        region = received.get(region_id)
+
+        if region is None:
+            if not region_status.activeAlerts:
+                continue
+            last_update, active_alerts = datetime.datetime.now(datetime.timezone.utc), []
+        else:
+            if region_status.lastUpdate == region.lastUpdate:
+                continue
+            last_update, active_alerts = region.lastUpdate, region.activeAlerts
 
-    new = []
-    old = []
-    _all = []
+        logger.info(f'Status changed [{region_id}] {region_status.lastUpdate} -> {last_update}')
+        changed = True
 
-    for region in regions:
-        if region.regionId == core.Config().reginId:
-            if status.model.lastUpdate == region.lastUpdate:
-                if is_start:
-                    await core.EventHandler.call(models.StatusChangeEvent(status=status.model, is_start=True))
-                return
+        with metrics.Metrics.time('diff_seconds'):
+            changes = diff.diff_alerts(region_status.activeAlerts, active_alerts)
 
-            logger.info(f'Status changed {status.model.lastUpdate} -> {region.lastUpdate}')
-            status.model.lastUpdate = region.lastUpdate
+        if changes.updated:
+            logger.debug('Alerts updated [%s]: %s', region_id, changes.updated)
 
-            _all += region.activeAlerts
+        if not is_start:
+            for i in changes.end:
+                await _transitions.submit(models.AlertEvent(alert=i, alert_type=models.AlertEventType.end))
 
-            for alert in region.activeAlerts:
-                if alert not in status.model.activeAlerts:
-                    new.append(alert)
+            for i in changes.start:
+                await _transitions.submit(models.AlertEvent(alert=i, alert_type=models.AlertEventType.start))
 
-            for alert in status.model.activeAlerts:
-                if alert not in region.activeAlerts:
-                    old.append(alert)
+            transitioned = transitioned or bool(changes.start or changes.end)
 
-    if not is_start:
-        for i in old:
-            await alarm_trigger(models.AlertEvent(alert=i, alert_type=models.AlertEventType.end))
-            status.model.activeAlerts.remove(i)
+        region_status.lastUpdate = last_update
+        region_status.activeAlerts = list(active_alerts)
 
-        for i in new:
-            await alarm_trigger(models.AlertEvent(alert=i, alert_type=models.AlertEventType.start))
-            status.model.activeAlerts.append(i)
+    if is_start and status.model.pendingEnds:
+        await resume_pending_ends(status)
+        transitioned = True
+    elif transitioned:
+        status.model.pendingEnds = _transitions.held()
 
-    status.model.activeAlerts = _all
+    if not changed:
+        if transitioned:
+            await status.flush()
+        if is_start:
+            await core.EventHandler.call(models.StatusChangeEvent(status=status.model, is_start=True))
+        return False
 
-    status.save()
+    status.model.lastUpdate = max(
+        (region_status.lastUpdate for region_status in status.model.regions.values()
+         if region_status.lastUpdate is not None),
+        default=status.model.lastUpdate
+    )
+    status.model.activeAlerts = [
+        alert
+        for region_status in status.model.regions.values()
+        for alert in region_status.activeAlerts
+    ]
+
+    if transitioned:
+        await status.flush()
+    else:
+        status.save()
     await core.EventHandler.call(models.StatusChangeEvent(status=status.model))
+    return True
 
 
-async def mainloop():
-    await periodic_check_alarm(True)
+async def dump_metrics(file_name: str, interval: float):
+    loop = asyncio.get_running_loop()
     while True:
-        await asyncio.sleep(core.Config().check_interval)
-        await periodic_check_alarm()
+        await asyncio.sleep(interval)
+        # render on the loop, which owns the metric dicts; only the file write goes to a thread
+        await loop.run_in_executor(None, metrics.write_text, file_name, metrics.Metrics.render())
+
+
+async def mainloop():
+    conf = core.Config()
+    # a rehearsal only serves and dumps metrics when replay_outputs asks for it
+    outputs = not conf.rehearsal or conf.replay_outputs
+    server = None
+    if conf.fanout_port is not None and outputs:
+        import fanout  # aiohttp.web is only needed when serving
+
+        server = fanout.FanoutServer(conf.fanout_host, conf.fanout_port)
+        await server.start()
+
+    dumper = None
+    if conf.metrics_file is not None and outputs:
+        dumper = asyncio.create_task(dump_metrics(conf.metrics_file, conf.metrics_interval))
+
+    core.Config.start_action_workers()
+    watcher = asyncio.create_task(core.Config.watch())
+
+    try:
+        await sources.create_source().run()
+    finally:
+        watcher.cancel()
+        await _transitions.flush()
+        if dumper is not None:
+            dumper.cancel()
+            metrics.Metrics.dump(conf.metrics_file)
+        if server is not None:
+            await server.stop()
+        await core.Status().close()
+        await asyncio.get_running_loop().run_in_executor(None, journal.Journal.close)
@@ -1,16 +1,16 @@
 import asyncio
+import multiprocessing
 import os
 import sys
 import tkinter as tk
 
-from PIL import Image, ImageTk
 from async_tkinter_loop import async_handler, async_mainloop
-from tzlocal import get_localzone
 
 import core
 import funcs
 import logs
 import models
+import workers
 
 
 def resource_path(relative_path):
@@ -24,28 +24,26 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
-TIME_FORMAT = '%H:%M:%S %d.%m'
+def set_icon(window: tk.Tk):
+    from PIL import Image, ImageTk  # only the window icon needs PIL
 
-core.init()
+    window.wm_iconphoto(True, ImageTk.PhotoImage(Image.open(resource_path("favicon.ico"))))
 
-root = tk.Tk()
-root.title('Radio Alarm')
-root.geometry('250x150')
-root.resizable(False, False)
 
-ico = Image.open(resource_path("favicon.ico"))
+def local_timezone():
+    global _local_timezone
+    if _local_timezone is None:
+        from tzlocal import get_localzone
 
-root.wm_iconphoto(True, ImageTk.PhotoImage(ico))
+        _local_timezone = get_localzone()
+    return _local_timezone
 
-loop = asyncio.get_event_loop()
 
-mainloop_task = None
+TIME_FORMAT = '%H:%M:%S %d.%m'
 
-last_update = tk.Label(root, text="Last Update: ")
-last_status = tk.Label(root, text="Last Status: ")
-status_label = tk.Label(root, text="Status: off", fg='#00f')
-start_button = tk.Button(root, text="Start")
-stop_button = tk.Button(root, text="Stop", state='disabled')
+_local_timezone = None
+
+mainloop_task = None
 
 
 async def start():
@@ -80,8 +78,7 @@ async def stop():
 
 @core.EventHandler.register_callback_dec(models.EventType.status_change)
 async def set_last_status(event: models.StatusChangeEvent):
-    tz = get_localzone()
-    local_timestamp = event.status.lastUpdate.astimezone(tz)
+    local_timestamp = event.status.lastUpdate.astimezone(local_timezone())
     last_status['text'] = f"Last Status: {local_timestamp.strftime(TIME_FORMAT)}"
     status_label[
         'text'] = f"Status: {' '.join(map(lambda x: x.type, event.status.activeAlerts)) if len(event.status.activeAlerts) > 0 else 'Clear'}"
@@ -93,14 +90,37 @@ async def set_last_update(event: models.StatusReceivedEvent):
     last_update['text'] = f"Last Update: {event.timestamp.strftime(TIME_FORMAT)}"
 
 
-start_button.config(command=async_handler(start))
-stop_button.config(command=async_handler(stop))
-
-start_button.pack()
-stop_button.pack()
-status_label.pack()
-last_update.pack()
-last_status.pack()
-
 if __name__ == '__main__':
-    async_mainloop(root)
+    # A frozen build re-runs this entry point in every spawned action worker; freeze_support() runs the worker there.
+    multiprocessing.freeze_support()
+    # The window is only built when run as a script: spawned action workers re-import this module.
+    core.init()
+
+    root = tk.Tk()
+    root.title('Radio Alarm')
+    root.geometry('250x150')
+    root.resizable(False, False)
+    set_icon(root)
+
+    loop = asyncio.get_event_loop()
+
+    last_update = tk.Label(root, text="Last Update: ")
+    last_status = tk.Label(root, text="Last Status: ")
+    status_label = tk.Label(root, text="Status: off", fg='#00f')
+    start_button = tk.Button(root, text="Start")
+    stop_button = tk.Button(root, text="Stop", state='disabled')
+
+    start_button.config(command=async_handler(start))
+    stop_button.config(command=async_handler(stop))
+
+    start_button.pack()
+    stop_button.pack()
+    status_label.pack()
+    last_update.pack()
+    last_status.pack()
+
+    try:
+        async_mainloop(root)
+    finally:
+        loop.run_until_complete(core.Session.close())
+        workers.WorkerPool.close()
@@ -0,0 +1,179 @@
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Tuple
+
+import models
+from logs import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    region_id TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    last_update REAL
+);
+CREATE INDEX IF NOT EXISTS alert_events_region_ts ON alert_events (region_id, ts);
+
+CREATE TABLE IF NOT EXISTS action_outcomes (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    region_id TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS action_outcomes_region_ts ON action_outcomes (region_id, ts);
+"""
+
+DURATIONS_QUERY = """
+SELECT alert_type, COUNT(*), SUM(next_ts - ts), AVG(next_ts - ts), MIN(next_ts - ts), MAX(next_ts - ts)
+FROM (
+    SELECT alert_type, ts, event_type,
+           LEAD(ts) OVER (PARTITION BY alert_type ORDER BY ts) AS next_ts,
+           LEAD(event_type) OVER (PARTITION BY alert_type ORDER BY ts) AS next_event_type
+    FROM alert_events
+    WHERE region_id = ? AND ts BETWEEN ? AND ?
+)
+WHERE event_type = 'start' AND next_event_type = 'end'
+GROUP BY alert_type
+ORDER BY alert_type
+"""
+
+
+def connect(file_name: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(file_name, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class Journal:
+    """Append-only SQLite (WAL) journal of alert events and action outcomes, written in batches off the loop."""
+
+    FILE_NAME = 'journal.sqlite3'
+    BATCH_SIZE = 500
+
+    _queue: queue.Queue = None
+    _thread: threading.Thread = None
+
+    def __new__(cls, *args, **kwargs):
+        raise NotImplementedError()
+
+    @classmethod
+    def _put(cls, table: str, row: Tuple):
+        if cls._thread is None or not cls._thread.is_alive():
+            cls._queue = queue.Queue()
+            cls._thread = threading.Thread(target=cls._write, args=(cls._queue,), name='journal', daemon=True)
+            cls._thread.start()
+        cls._queue.put((table, row))
+
+    @classmethod
+    def record_alert(cls, event: models.AlertEvent):
+        cls._put('alert_events', (
+            time.time(),
+            event.alert.regionId,
+            event.alert.type.value,
+            event.alert_type.value,
+            event.alert.lastUpdate.timestamp(),
+        ))
+
+    @classmethod
+    def record_action(cls, event: models.AlertEvent, action_type: models.ActionType, success: bool, message: str = None):
+        cls._put('action_outcomes', (
+            time.time(),
+            event.alert.regionId,
+            event.alert.type.value,
+            event.alert_type.value,
+            action_type.value,
+            int(success),
+            message,
+        ))
+
+    @classmethod
+    def close(cls):
+        if cls._thread is not None and cls._thread.is_alive():
+            cls._queue.put(None)
+            cls._thread.join()
+        cls._thread = None
+
+    @staticmethod
+    def _write(rows: queue.Queue):
+        connection = connect(Journal.FILE_NAME)
+        statements = {
+            'alert_events': "INSERT INTO alert_events (ts, region_id, alert_type, event_type, last_update) "
+                            "VALUES (?, ?, ?, ?, ?)",
+            'action_outcomes': "INSERT INTO action_outcomes "
+                               "(ts, region_id, alert_type, event_type, action_type, success, message) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        }
+        closing = False
+        try:
+            while not closing:
+                batch = [rows.get()]
+                while len(batch) < Journal.BATCH_SIZE and not rows.empty():
+                    batch.append(rows.get_nowait())
+
+                if None in batch:
+                    closing = True
+                    batch = [item for item in batch if item is not None]
+
+                try:
+                    with connection:
+                        for table, row in batch:
+                            connection.execute(statements[table], row)
+                except sqlite3.Error as exc:
+                    logger.exception(exc)
+        finally:
+            connection.close()
+
+
+def query_events(region_id: str, since: float, until: float) -> List[Tuple]:
+    connection = connect(Journal.FILE_NAME)
+    try:
+        return connection.execute(
+            "SELECT ts, alert_type, event_type FROM alert_events "
+            "WHERE region_id = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+            (region_id, since, until)
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def query_durations(region_id: str, since: float, until: float) -> List[Tuple]:
+    connection = connect(Journal.FILE_NAME)
+    try:
+        return connection.execute(DURATIONS_QUERY, (region_id, since, until)).fetchall()
+    finally:
+        connection.close()
+
+
+def parse_time(value: Optional[str], default: float) -> float:
+    if value is None:
+        return default
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+async def history(region_id: str, since: str = None, until: str = None, limit: str = '50'):
+    since, until = parse_time(since, 0), parse_time(until, time.time())
+
+    events = query_events(region_id, since, until)
+    for ts, alert_type, event_type in events[-int(limit):]:
+        print(f"{datetime.datetime.fromtimestamp(ts):%Y-%m-%d %H:%M:%S} {alert_type:<14} {event_type}")
+    print(f"{len(events)} event(s)")
+
+    for alert_type, count, total, average, shortest, longest in query_durations(region_id, since, until):
+        print(
+            f"{alert_type:<14} alerts={count:<6} "
+            f"total={datetime.timedelta(seconds=round(total))} "
+            f"avg={datetime.timedelta(seconds=round(average))} "
+            f"min={datetime.timedelta(seconds=round(shortest))} "
+            f"max={datetime.timedelta(seconds=round(longest))}"
+        )
@@ -1,29 +1,85 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 
 logger = logging.getLogger('radio_alarm')
 
+INFO_LOG_MAX_BYTES = 5 * 1024 * 1024
+DEBUG_LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
 
-def init_logger(debug: bool = False):
-    global logger
-    logger.setLevel(1)
+_listener: logging.handlers.QueueListener = None
 
-    formatter = logging.Formatter('%(asctime)s %(levelname)s:%(message)s')
 
-    info_file_handler = logging.FileHandler('info.log', encoding="UTF-8")
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log ingestion."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted, keeping exc_info so the listener's formatters render tracebacks off the loop."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def init_logger(debug: bool = False, json_format: bool = False):
+    """Log through a queue so file and console writes happen on a background thread, off the event loop."""
+    global _listener
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+
+    formatter = JsonFormatter() if json_format else logging.Formatter('%(asctime)s %(levelname)s:%(message)s')
+
+    info_file_handler = logging.handlers.RotatingFileHandler(
+        'info.log', maxBytes=INFO_LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="UTF-8"
+    )
     info_file_handler.setFormatter(formatter)
     info_file_handler.setLevel(logging.INFO)
 
-    logger.addHandler(info_file_handler)
+    handlers = [info_file_handler]
 
     if debug:
-        debug_file_handler = logging.FileHandler('debug.log', encoding="UTF-8")
+        debug_file_handler = logging.handlers.RotatingFileHandler(
+            'debug.log', maxBytes=DEBUG_LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="UTF-8"
+        )
         debug_file_handler.setFormatter(formatter)
         debug_file_handler.setLevel(logging.DEBUG)
 
-        logger.addHandler(debug_file_handler)
+        handlers.append(debug_file_handler)
 
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
     stream_handler.setLevel(logging.DEBUG if debug else logging.INFO)
 
-    logger.addHandler(stream_handler)
+    handlers.append(stream_handler)
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logger)
+
+
+def stop_logger():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,127 @@
+import bisect
+import contextlib
+import math
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in items) + '}'
+
+
+def _format_value(value: float) -> str:
+    return '+Inf' if value == math.inf else repr(float(value))
+
+
+class Metrics:
+    """In-process counters and latency histograms, rendered in the Prometheus text format."""
+
+    PREFIX = 'radio_alarm_'
+
+    _histograms: Dict[str, Dict[Labels, Histogram]] = {}
+    _counters: Dict[str, Dict[Labels, float]] = {}
+    _gauges: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def __new__(cls, *args, **kwargs):
+        raise NotImplementedError()
+
+    @classmethod
+    def observe(cls, name: str, value: float, **labels: str):
+        series = cls._histograms.setdefault(name, {})
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1, **labels: str):
+        series = cls._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    @classmethod
+    @contextlib.contextmanager
+    def time(cls, name: str, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.observe(name, time.perf_counter() - started, **labels)
+
+    @classmethod
+    def register_gauges(cls, name: str, collect: Callable[[], Dict[str, float]]):
+        """Expose the numeric values returned by collect as <name>_<key> gauges at render time."""
+        cls._gauges[name] = collect
+
+    @classmethod
+    def reset(cls):
+        cls._histograms.clear()
+        cls._counters.clear()
+
+    @classmethod
+    def render(cls) -> str:
+        lines: List[str] = []
+
+        for name, series in sorted(cls._counters.items()):
+            lines.append(f'# TYPE {cls.PREFIX}{name} counter')
+            for labels, value in series.items():
+                lines.append(f'{cls.PREFIX}{name}{_format_labels(labels)} {_format_value(value)}')
+
+        for name, series in sorted(cls._histograms.items()):
+            lines.append(f'# TYPE {cls.PREFIX}{name} histogram')
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{cls.PREFIX}{name}_bucket{_format_labels(labels, le=_format_value(bound))} {cumulative}'
+                    )
+                lines.append(f'{cls.PREFIX}{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+                lines.append(f'{cls.PREFIX}{name}_count{_format_labels(labels)} {histogram.count}')
+
+        for name, collect in sorted(cls._gauges.items()):
+            for key, value in collect().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'# TYPE {cls.PREFIX}{name}_{key} gauge')
+                    lines.append(f'{cls.PREFIX}{name}_{key} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def dump(cls, file_name: str):
+        """Write the current metrics atomically, e.g. for the node_exporter textfile collector."""
+        write_text(file_name, cls.render())
+
+
+def write_text(file_name: str, text: str):
+    """Replace file_name atomically; safe to run in an executor since it touches no metrics state."""
+    tmp_file_name = f'{file_name}.tmp'
+    with open(tmp_file_name, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file_name, file_name)
@@ -1,10 +1,10 @@
 import datetime
-import os
-from typing import Literal, Dict, Optional
+from typing import Literal, Dict, Optional, List, Tuple
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 import exceptions
+import executor
 from models.enums import AlertEventType, ActionType, AlertType
 from models.events import AlertEvent, Event
 from models.timetable import Timetable
@@ -19,28 +19,72 @@ class Action(BaseModel):
 
 class AlertAction(Action):
     timetable: Optional[Timetable] = Field(default_factory=Timetable)
+    timeout: Optional[float] = Field(default=60)
+    max_concurrency: int = Field(default=1, ge=1)
+    isolated: bool = Field(default=False)
+
+    _active: bool = PrivateAttr(default=True)
+    _active_until: Optional[datetime.datetime] = PrivateAttr(default=None)
 
     async def act(self, event: AlertEvent) -> None:
-        if self.timetable is not None and not self.is_in_timetable():
+        if not self.is_active():
             raise exceptions.OutOfTimeTableException()
 
+    def warm_up(self):
+        pass
+
+    def configured_alerts(self) -> Optional[Dict[AlertType, Dict[AlertEventType, object]]]:
+        """Alert and event types the action is configured for; None means it handles every alert."""
+        return None
+
+    def routes(self) -> List[Tuple[AlertType, AlertEventType]]:
+        configured = self.configured_alerts()
+        if configured is None:
+            return [(alert_type, event_type) for alert_type in AlertType for event_type in AlertEventType]
+        return [(alert_type, event_type) for alert_type, events in configured.items() for event_type in events]
+
     def is_in_timetable(self) -> bool:
         return self.timetable.is_in_timetable(datetime.datetime.now())
 
+    def is_active(self) -> bool:
+        """Timetable check that is only recomputed when the timetable's next transition has passed."""
+        if self.timetable is None:
+            return True
+
+        now = datetime.datetime.now()
+        if self._active_until is None or now >= self._active_until:
+            self._active = self.timetable.is_in_timetable(now)
+            self._active_until = self.timetable.next_transition(now) or datetime.datetime.max
+        return self._active
+
 
 class CopyFileAction(AlertAction):
     type: Literal[ActionType.copy_file] = Field(default=ActionType.copy_file)
     source_files: Dict[AlertType, Dict[AlertEventType, str]] = Field(default_factory=dict)
     destination_folder: str = Field(default_factory=str)
+    prewarm_sources: bool = Field(default=True)
 
-    async def act(self, event: AlertEvent) -> None:
+    async def act(self, event: AlertEvent) -> executor.CopyResult:
         await super().act(event)
 
         try:
-            os.system(f'copy "{self.source_files[event.alert.type][event.alert_type]}" "{self.destination_folder}"')
+            source_file = self.source_files[event.alert.type][event.alert_type]
         except KeyError:
             raise exceptions.AlertTypeNotConfiguredException(f"Alert type({event.alert.type}) not configured!")
 
+        return await executor.copy_file(source_file, self.destination_folder)
+
+    def configured_alerts(self) -> Dict[AlertType, Dict[AlertEventType, str]]:
+        return self.source_files
+
+    def warm_up(self):
+        if self.prewarm_sources:
+            executor.prewarm_files([
+                source_file
+                for files in self.source_files.values()
+                for source_file in files.values()
+            ])
+
 
 class LocalConsoleExecuteAction(AlertAction):
     type: Literal[ActionType.local_console_execute] = Field(
@@ -48,10 +92,15 @@ class LocalConsoleExecuteAction(AlertAction):
     )
     commands: Dict[AlertType, Dict[AlertEventType, str]] = Field(default_factory=dict)
 
-    async def act(self, event: AlertEvent) -> None:
+    async def act(self, event: AlertEvent) -> executor.CommandResult:
         await super().act(event)
 
         try:
-            os.system(self.commands[event.alert.type][event.alert_type])
+            command = self.commands[event.alert.type][event.alert_type]
         except KeyError:
             raise exceptions.AlertTypeNotConfiguredException(f"Alert type({event.alert.type}) not configured!")
+
+        return await executor.run_command(command)
+
+    def configured_alerts(self) -> Dict[AlertType, Dict[AlertEventType, str]]:
+        return self.commands
@@ -1,22 +1,40 @@
 import datetime
-from typing import List
+from typing import List, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from models.enums import RegionType, AlertType
 
 
+AlertKey = Tuple[str, AlertType]
+
+
 class Alert(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     regionId: str
     regionType: RegionType
     type: AlertType
     lastUpdate: datetime.datetime
 
+    @property
+    def key(self) -> AlertKey:
+        return self.regionId, self.type
+
     def __eq__(self, other: 'Alert'):
         return self.regionId == other.regionId and self.type == other.type
 
+    def __hash__(self):
+        return hash(self.key)
+
+
+class AlertIndex(BaseModel):
+    lastActionIndex: int
+
 
 class Region(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     regionId: str
     regionType: RegionType
     regionName: str
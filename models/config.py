@@ -1,9 +1,10 @@
 import sys
-from typing import List, Union
+from typing import Dict, List, Union
 
 from pydantic import BaseModel, Field
 
 from models.actions import AlertAction
+from models.enums import AlertType, PollMode, StreamType, OverflowPolicy
 
 if sys.platform == "win32":
     from models.win_actions import *
@@ -11,10 +12,64 @@ if sys.platform == "win32":
 AlertActionTypes = Union[tuple(AlertAction.__subclasses__())]
 
 
+class RegionConfigModel(BaseModel):
+    regionId: str
+    actions: List[AlertActionTypes] = Field(default_factory=list, discriminator='type')
+
+
 class ConfigModel(BaseModel):
     reginId: str = Field(default='0')
     check_interval: int = Field(default=10)
+    active_check_interval: float = Field(default=5)
+    max_backoff_interval: float = Field(default=300)
+    poll_mode: PollMode = Field(default=PollMode.full)
+    fast_decode: bool = Field(default=True)
+    stream_url: Union[str, None] = Field(default=None)
+    stream_type: StreamType = Field(default=StreamType.sse)
+    stream_reconnect_interval: int = Field(default=30)
     api_base_url: Union[str, None] = Field(default=None)
+    api_base_urls: List[str] = Field(default_factory=list)
+    hedge_delay: float = Field(default=1.0)
+    circuit_breaker_threshold: int = Field(default=3, ge=1)
+    circuit_breaker_reset_timeout: float = Field(default=30)
+    rate_limit_per_minute: float = Field(default=0, ge=0)
+    rate_limit_burst: int = Field(default=3, ge=1)
+    max_retries: int = Field(default=3, ge=0)
     api_key: Union[str, None] = Field(default=None)
     enable_ssl_validation: bool = Field(default=True)
+    keepalive_timeout: float = Field(default=60)
+    dns_cache_ttl: int = Field(default=300)
+    regions_cache_ttl: int = Field(default=24 * 60 * 60)
+    fanout_host: str = Field(default='0.0.0.0')
+    fanout_port: Union[int, None] = Field(default=None)
+    event_queue_size: int = Field(default=100, ge=1)
+    event_overflow_policy: OverflowPolicy = Field(default=OverflowPolicy.drop_oldest)
+    journal_enabled: bool = Field(default=True)
+    record_file: Union[str, None] = Field(default=None)
+    replay_file: Union[str, None] = Field(default=None)
+    replay_speed: float = Field(default=1, ge=0)
+    replay_actions: bool = Field(default=False)
+    replay_outputs: bool = Field(default=False)
+    metrics_file: Union[str, None] = Field(default=None)
+    metrics_interval: float = Field(default=60, gt=0)
+    config_watch_interval: float = Field(default=5, ge=0)
+    action_workers: int = Field(default=2, ge=1)
+    flap_merge_window: float = Field(default=0, ge=0)
+    flap_min_hold: Dict[AlertType, float] = Field(default_factory=dict)
     actions: List[AlertActionTypes] = Field(default_factory=list, discriminator='type')
+    regions: List[RegionConfigModel] = Field(default_factory=list)
+
+    @property
+    def watched_regions(self) -> List[RegionConfigModel]:
+        if self.regions and not self.actions:
+            return self.regions
+        return [RegionConfigModel(regionId=self.reginId, actions=self.actions), *self.regions]
+
+    @property
+    def rehearsal(self) -> bool:
+        """Replaying a recording: status, journal and record_file are left untouched."""
+        return self.replay_file is not None
+
+    @property
+    def region_ids(self) -> List[str]:
+        return [region.regionId for region in self.watched_regions]
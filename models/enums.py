@@ -39,3 +39,26 @@ class ActionType(str, Enum):
 
     py_auto_gui_shortcut = "py_auto_gui_shortcut"
     power_shell_shortcut = "power_shell_shortcut"
+
+
+class PollMode(str, Enum):
+    full = "full"
+    index = "index"
+
+
+class StreamType(str, Enum):
+    sse = "sse"
+    websocket = "websocket"
+
+
+class OverflowPolicy(str, Enum):
+    block = "block"
+    drop_oldest = "drop_oldest"
+    drop_newest = "drop_newest"
+
+
+class PollOutcome(str, Enum):
+    unchanged = "unchanged"
+    changed = "changed"
+    failed = "failed"
+    rate_limited = "rate_limited"
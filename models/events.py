@@ -1,22 +1,31 @@
 import datetime
-from typing import Literal, List
+from typing import Literal, List, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
 from models.api import Alert, Region
-from models.enums import EventType, AlertEventType
+from models.enums import EventType, AlertEventType, AlertType
 from models.status import StatusModel
 
 
 class Event(BaseModel):
     type: Literal[EventType.none]
 
+    @property
+    def route(self) -> Optional[Tuple]:
+        """Key used to deliver the event only to subscribers registered for it; None reaches broadcast ones only."""
+        return None
+
 
 class AlertEvent(Event):
     type: Literal[EventType.alert] = Field(default=EventType.alert)
     alert_type: AlertEventType
     alert: Alert
 
+    @property
+    def route(self) -> Tuple[str, AlertType, AlertEventType]:
+        return self.alert.regionId, self.alert.type, self.alert_type
+
 
 class StatusChangeEvent(Event):
     type: Literal[EventType.status_change] = Field(default=EventType.status_change)
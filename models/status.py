@@ -1,11 +1,18 @@
 import datetime
-from typing import List
+from typing import List, Dict, Optional
 
 from pydantic import BaseModel, Field
 
 from models.api import Alert
 
 
+class RegionStatusModel(BaseModel):
+    lastUpdate: Optional[datetime.datetime] = Field(default=None)
+    activeAlerts: List[Alert] = Field(default_factory=list)
+
+
 class StatusModel(BaseModel):
     lastUpdate: datetime.datetime = Field(default_factory=datetime.datetime.now)
     activeAlerts: List[Alert] = Field(default_factory=list)
+    regions: Dict[str, RegionStatusModel] = Field(default_factory=dict)
+    pendingEnds: List[Alert] = Field(default_factory=list)
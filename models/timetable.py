@@ -1,7 +1,19 @@
+import bisect
 import datetime
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+DAY = 24 * 60 * 60 * 1_000_000
+WEEK = 7 * DAY
+
+
+def time_of_day(time: datetime.time) -> int:
+    return ((time.hour * 60 + time.minute) * 60 + time.second) * 1_000_000 + time.microsecond
+
+
+def time_of_week(dt: datetime.datetime) -> int:
+    return dt.weekday() * DAY + time_of_day(dt.time())
 
 
 class Interval(BaseModel):
@@ -9,7 +21,19 @@ class Interval(BaseModel):
     end: datetime.time
 
     def is_in_interval(self, time: datetime.time):
-        return self.start <= time <= self.end
+        if self.start <= self.end:
+            return self.start <= time <= self.end
+        return self.start <= time or time <= self.end
+
+    def spans(self, weekday: int) -> List[List[int]]:
+        """Half-open [start, end) spans in microseconds of the week, split at midnight of Sunday."""
+        start = weekday * DAY + time_of_day(self.start)
+        end = weekday * DAY + time_of_day(self.end) + 1
+        if self.end < self.start:
+            end += DAY
+        if end <= WEEK:
+            return [[start, end]]
+        return [[start, WEEK], [0, end - WEEK]]
 
     @classmethod
     def full_time(cls):
@@ -29,14 +53,44 @@ class Timetable(BaseModel):
     sat: List[Interval] = Field(default_factory=Interval.full_time_list)
     sun: List[Interval] = Field(default_factory=Interval.full_time_list)
 
-    def is_in_timetable(self, dt: datetime.datetime):
-        intervals = {
-            0: self.mon,
-            1: self.tue,
-            2: self.wed,
-            3: self.thu,
-            4: self.fri,
-            5: self.sat,
-            6: self.sun
-        }[dt.weekday()]
-        return any((interval.is_in_interval(dt.time()) for interval in intervals))
+    _bounds: List[int] = PrivateAttr(default_factory=list)
+    _transitions: List[int] = PrivateAttr(default_factory=list)
+
+    def model_post_init(self, __context) -> None:
+        self.compile()
+
+    def compile(self):
+        """Build a sorted list of merged [start, end) bounds over the week for binary search."""
+        spans = sorted(
+            span
+            for weekday, intervals in enumerate((self.mon, self.tue, self.wed, self.thu, self.fri, self.sat, self.sun))
+            for interval in intervals
+            for span in interval.spans(weekday)
+        )
+
+        merged: List[List[int]] = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        self._bounds = [bound for span in merged for bound in span]
+
+        transitions = self._bounds
+        if transitions and transitions[0] == 0 and transitions[-1] == WEEK:
+            transitions = transitions[1:-1]
+        self._transitions = transitions
+
+    def is_in_timetable(self, dt: datetime.datetime) -> bool:
+        return bisect.bisect_right(self._bounds, time_of_week(dt)) % 2 == 1
+
+    def next_transition(self, dt: datetime.datetime) -> Optional[datetime.datetime]:
+        """Return the moment after dt when the timetable next switches between active and inactive."""
+        if not self._transitions:
+            return None
+
+        now = time_of_week(dt)
+        index = bisect.bisect_right(self._transitions, now)
+        at = self._transitions[index] if index < len(self._transitions) else self._transitions[0] + WEEK
+        return dt + datetime.timedelta(microseconds=at - now)
@@ -2,11 +2,10 @@ import asyncio
 from asyncio import subprocess
 from typing import Literal, List, Dict, Union, Optional
 
-import pyautogui
-import pygetwindow
 from pydantic import Field
 
 import exceptions
+import executor
 from models import Timetable
 from models.actions import AlertAction
 from models.enums import AlertEventType, ActionType, AlertType
@@ -22,12 +21,20 @@ class PyAutoGuiShortcut(AlertAction):
 
     async def act(self, event: AlertEvent) -> None:
 
+        import pyautogui  # loaded on first use, it is slow to import
+
         await asyncio.sleep(0.2)
         try:
             pyautogui.hotkey(*self.shortcut[event.alert.type][event.alert_type])
         except KeyError:
             raise exceptions.AlertTypeNotConfiguredException(f"Alert type({event.alert.type}) not configured!")
 
+    def configured_alerts(self) -> Dict[AlertType, Dict[AlertEventType, List[str]]]:
+        return self.shortcut
+
+    def warm_up(self):
+        executor.preload_modules(['pyautogui'])
+
 
 class PSShortcut(AlertAction):
     type: Literal[ActionType.power_shell_shortcut] = Field(
@@ -58,6 +65,9 @@ class PSShortcut(AlertAction):
         except KeyError:
             raise exceptions.AlertTypeNotConfiguredException(f"Alert type({event.alert.type}) not configured!")
 
+    def configured_alerts(self) -> Dict[AlertType, Dict[AlertEventType, str]]:
+        return self.shortcut
+
 
 class WinAppShortcutAction(AlertAction):
     type: Literal[ActionType.windows_application_shortcut] = Field(
@@ -67,6 +77,8 @@ class WinAppShortcutAction(AlertAction):
     shortcut_action: Union[PyAutoGuiShortcut, PSShortcut] = Field(default=None)
 
     async def act(self, event: AlertEvent) -> None:
+        import pygetwindow  # loaded on first use, it is slow to import
+
         await super().act(event)
 
         windows = list(filter(lambda x: x.title == self.window_name, pygetwindow.getWindowsWithTitle(self.window_name)))
@@ -79,6 +91,14 @@ class WinAppShortcutAction(AlertAction):
 
             await self.shortcut_action.act(event)
 
+    def configured_alerts(self) -> Optional[Dict[AlertType, Dict[AlertEventType, object]]]:
+        return self.shortcut_action.configured_alerts() if self.shortcut_action is not None else None
+
+    def warm_up(self):
+        executor.preload_modules(['pygetwindow'])
+        if self.shortcut_action is not None:
+            self.shortcut_action.warm_up()
+
 
 class WinAppPSShortcutAction(AlertAction):
     type: Literal[ActionType.windows_powershell_application_shortcut] = Field(
@@ -106,3 +126,10 @@ class WinAppPSShortcutAction(AlertAction):
             raise exceptions.WinWindowNotFoundException(f'[stderr]\n{stderr.decode()}')
 
         await self.shortcut_action.act(event)
+
+    def configured_alerts(self) -> Optional[Dict[AlertType, Dict[AlertEventType, object]]]:
+        return self.shortcut_action.configured_alerts() if self.shortcut_action is not None else None
+
+    def warm_up(self):
+        if self.shortcut_action is not None:
+            self.shortcut_action.warm_up()
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Tuple, Union
+
+_last_bodies: Dict[str, str] = {}
+
+
+def _append(file_name: str, line: str):
+    with open(file_name, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+async def record(file_name: str, body: Union[bytes, str], received_at: float = None):
+    """Append a raw API response and the time it was received to a JSON lines recording.
+
+    A body equal to the previous one (e.g. served from the 304 cache) is written as an unchanged marker.
+    """
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+
+    entry = {"t": received_at or time.time()}
+    if _last_bodies.get(file_name) == body:
+        entry["unchanged"] = True
+    else:
+        entry["body"] = _last_bodies[file_name] = body
+
+    line = json.dumps(entry) + '\n'
+    await asyncio.get_running_loop().run_in_executor(None, _append, file_name, line)
+
+
+def load(file_name: str) -> List[Tuple[float, str]]:
+    records = []
+    with open(file_name, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                if not item.get('unchanged'):
+                    records.append((item['t'], item['body']))
+                elif records:
+                    records.append((item['t'], records[-1][1]))
+    return records
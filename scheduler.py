@@ -0,0 +1,78 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+import core
+import metrics
+import models
+from logs import logger
+
+
+class PollScheduler:
+    """Runs ticks on fixed monotonic-clock deadlines, adapting the interval to alert activity and errors."""
+
+    def __init__(self):
+        self.interval: float = None
+        self.failures = 0
+        self.ticks = 0
+        self.missed = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def next_interval(self, outcome: models.PollOutcome) -> float:
+        conf = core.Config()
+
+        if outcome in (models.PollOutcome.failed, models.PollOutcome.rate_limited):
+            self.failures += 1
+            factor = 2 ** (self.failures + (outcome == models.PollOutcome.rate_limited))
+            return min(conf.check_interval * factor, conf.max_backoff_interval)
+
+        self.failures = 0
+        if outcome == models.PollOutcome.changed or core.Status().model.activeAlerts:
+            return min(conf.check_interval, conf.active_check_interval)
+        return conf.check_interval
+
+    async def run(self, tick: Callable[[], Awaitable[models.PollOutcome]], duration: float = None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        end = None if duration is None else deadline + duration
+
+        while True:
+            jitter = max(0.0, loop.time() - deadline)
+            self.ticks += 1
+            self.jitter_total += jitter
+            self.jitter_max = max(self.jitter_max, jitter)
+            metrics.Metrics.observe('poll_jitter_seconds', jitter)
+
+            try:
+                outcome = await tick()
+            except Exception as exc:
+                # one unexpected bad response must not stop detection; back off as for any failed poll
+                logger.exception(exc)
+                outcome = models.PollOutcome.failed
+
+            interval = self.next_interval(outcome)
+            if interval != self.interval:
+                logger.debug('Poll interval %s -> %s (%s)', self.interval, interval, outcome.value)
+                self.interval = interval
+
+            deadline += interval
+            now = loop.time()
+            if now > deadline:
+                missed = int((now - deadline) // interval) + 1
+                self.missed += missed
+                metrics.Metrics.inc('poll_missed_deadlines_total', missed)
+                deadline += missed * interval
+                logger.debug('Poll tick overran, skipped %s deadline(s)', missed)
+
+            if end is not None and deadline >= end:
+                return
+            await asyncio.sleep(deadline - now)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'interval': self.interval,
+            'ticks': self.ticks,
+            'missed': self.missed,
+            'jitter_avg': self.jitter_total / self.ticks if self.ticks else 0.0,
+            'jitter_max': self.jitter_max,
+        }
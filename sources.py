@@ -0,0 +1,134 @@
+import asyncio
+import time
+from typing import AsyncIterator
+
+import aiohttp
+
+import core
+import funcs
+import models
+import recording
+import scheduler
+from logs import logger
+
+
+class AlertSource:
+    """Feeds received alert statuses into the alarm pipeline."""
+
+    def __init__(self):
+        self.started = False
+
+    async def run(self):
+        raise NotImplementedError()
+
+
+class PollingSource(AlertSource):
+    """Polls the alerts API on the adaptive PollScheduler."""
+
+    def __init__(self):
+        super().__init__()
+        self.scheduler = scheduler.PollScheduler()
+
+    async def tick(self) -> models.PollOutcome:
+        outcome = await funcs.periodic_check_alarm(not self.started)
+        self.started = True
+        return outcome
+
+    async def run(self, duration: float = None):
+        await self.scheduler.run(self.tick, duration)
+
+
+class StreamSource(AlertSource):
+    """Receives alert statuses pushed over SSE or WebSocket, polling while the stream is down."""
+
+    READ_TIMEOUT = 60
+
+    def __init__(self, url: str, stream_type: models.StreamType):
+        super().__init__()
+        self.url = url
+        self.stream_type = stream_type
+        self.fallback = PollingSource()
+
+    async def messages(self) -> AsyncIterator:
+        if self.stream_type == models.StreamType.websocket:
+            async with core.Session().ws_connect(self.url, heartbeat=StreamSource.READ_TIMEOUT / 2) as ws:
+                logger.info(f'Alert stream connected: {self.url}')
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        yield message.data
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        raise ws.exception()
+            return
+
+        async with core.Session().get(
+                self.url,
+                headers={"accept": "text/event-stream"},
+                timeout=aiohttp.ClientTimeout(total=None, sock_read=StreamSource.READ_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            logger.info(f'Alert stream connected: {self.url}')
+
+            data = []
+            async for line in response.content:
+                line = line.decode('utf-8').rstrip('\r\n')
+                if not line:
+                    if data:
+                        yield '\n'.join(data)
+                        data = []
+                elif line.startswith('data:'):
+                    data.append(line[6:] if line.startswith('data: ') else line[5:])
+
+    async def run(self):
+        while True:
+            try:
+                async for response in self.messages():
+                    logger.debug('Stream packet received: %s', response)
+                    regions = await funcs.receive_status(response)
+                    if regions is not None:
+                        await funcs.check_alarm(regions, not self.started)
+                        self.started = True
+                logger.warning('Alert stream closed')
+            except (aiohttp.ClientError, TimeoutError) as exc:
+                logger.warning(f'Alert stream dropped: {exc!r}')
+
+            logger.info('Falling back to polling')
+            self.fallback.started = self.started
+            await self.fallback.run(core.Config().stream_reconnect_interval)
+            self.started = True
+
+
+class ReplaySource(AlertSource):
+    """Feeds a recording made with record_file through the alarm pipeline.
+
+    speed scales the recorded gaps between responses; 0 replays them as fast as possible.
+    """
+
+    def __init__(self, file_name: str, speed: float = 1):
+        super().__init__()
+        self.file_name = file_name
+        self.speed = speed
+
+    async def run(self):
+        records = await asyncio.get_running_loop().run_in_executor(None, recording.load, self.file_name)
+        logger.info(f'Replaying {len(records)} response(s) from {self.file_name} at speed {self.speed or "max"}')
+
+        started = time.monotonic()
+        for received_at, response in records:
+            if self.speed > 0:
+                await asyncio.sleep(started + (received_at - records[0][0]) / self.speed - time.monotonic())
+
+            regions = await funcs.receive_status(response)
+            if regions is not None:
+                await funcs.check_alarm(regions, not self.started)
+                self.started = True
+
+        logger.info('Replay finished')
+
+
+def create_source() -> AlertSource:
+    conf = core.Config()
+    if conf.replay_file is not None:
+        return ReplaySource(conf.replay_file, conf.replay_speed)
+    if conf.stream_url is None:
+        return PollingSource()
+    return StreamSource(conf.stream_url, conf.stream_type)
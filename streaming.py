@@ -0,0 +1,90 @@
+import asyncio
+import json
+from typing import Set
+
+from aiohttp import web
+
+
+def versioned_json_response(request: web.Request, payload, version) -> web.Response:
+    """JSON response tagged with an ETag, answering 304 when the client already has this version."""
+    etag = f'"{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        return web.Response(status=304, headers={'ETag': etag})
+    return web.json_response(payload, headers={'ETag': etag})
+
+
+class StreamHub:
+    """Broadcasts JSON payloads to SSE and WebSocket subscribers."""
+
+    PING_INTERVAL = 15
+    QUEUE_SIZE = 100
+
+    def __init__(self, snapshot: callable = None):
+        self.snapshot = snapshot
+        self._queues: Set[asyncio.Queue] = set()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._queues)
+
+    def publish(self, payload):
+        data = json.dumps(payload)
+        for queue in self._queues:
+            self._put(queue, data)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, data: str):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(data)
+
+    def _subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(StreamHub.QUEUE_SIZE)
+        if callable(self.snapshot):
+            self._put(queue, json.dumps(self.snapshot()))
+        self._queues.add(queue)
+        return queue
+
+    async def sse_handler(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+
+        queue = self._subscribe()
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), StreamHub.PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    await response.write(b': ping\n\n')
+                    continue
+                await response.write(f'data: {data}\n\n'.encode('utf-8'))
+        except ConnectionResetError:
+            pass
+        finally:
+            self._queues.discard(queue)
+        return response
+
+    async def ws_handler(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=StreamHub.PING_INTERVAL)
+        await ws.prepare(request)
+
+        queue = self._subscribe()
+
+        async def send():
+            try:
+                while not ws.closed:
+                    await ws.send_str(await queue.get())
+            except ConnectionResetError:
+                pass
+
+        sender = asyncio.create_task(send())
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            sender.cancel()
+            self._queues.discard(queue)
+        return ws
@@ -0,0 +1,117 @@
+import asyncio
+import datetime
+from typing import List, Dict
+
+from aiohttp import web
+
+from models.enums import AlertType, RegionType
+from streaming import StreamHub, versioned_json_response
+
+
+def region_payload(region_id: str, alert_types: List[AlertType], last_update: datetime.datetime = None) -> dict:
+    last_update = (last_update or datetime.datetime.now(datetime.timezone.utc)).isoformat()
+    return {
+        "regionId": region_id,
+        "regionType": RegionType.State,
+        "regionName": f"Region {region_id}",
+        "regionEngName": f"Region {region_id}",
+        "lastUpdate": last_update,
+        "activeAlerts": [
+            {
+                "regionId": region_id,
+                "regionType": RegionType.State,
+                "type": alert_type,
+                "lastUpdate": last_update,
+            }
+            for alert_type in alert_types
+        ],
+    }
+
+
+class StubServer:
+    """Local stand-in for the alerts API, with SSE and WebSocket streams, for offline testing."""
+
+    BASE_PATH = "/api/v3"
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, delay: float = 0, fail: bool = False):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.fail = fail
+        self.requests = 0
+        self.regions: List[Dict] = []
+        self.index = 0
+        self.hub = StreamHub(lambda: self.regions)
+        self._runner: web.AppRunner = None
+
+        self.app = web.Application(middlewares=[self.faults])
+        self.app.router.add_get(f"{StubServer.BASE_PATH}/alerts", self.alerts)
+        self.app.router.add_get(f"{StubServer.BASE_PATH}/alerts/status", self.alert_index)
+        self.app.router.add_get(f"{StubServer.BASE_PATH}/alerts/stream", self.hub.sse_handler)
+        self.app.router.add_get(f"{StubServer.BASE_PATH}/alerts/ws", self.hub.ws_handler)
+        self.app.router.add_get(f"{StubServer.BASE_PATH}/alerts/{{regionId}}", self.region_alerts)
+        self.app.router.add_get(f"{StubServer.BASE_PATH}/regions", self.region_list)
+        self.app.router.add_post("/control/alerts", self.control_alerts)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{StubServer.BASE_PATH}"
+
+    def set_alerts(self, regions: List[Dict]):
+        self.regions = regions
+        self.index += 1
+        self.hub.publish(regions)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def faults(self, request: web.Request, handler) -> web.StreamResponse:
+        if request.path.startswith(StubServer.BASE_PATH) and request.path not in (
+                f"{StubServer.BASE_PATH}/alerts/stream", f"{StubServer.BASE_PATH}/alerts/ws"
+        ):
+            self.requests += 1
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.fail:
+                return web.Response(status=503, text="Stub server failure")
+        return await handler(request)
+
+    async def alerts(self, request: web.Request) -> web.Response:
+        return versioned_json_response(request, self.regions, self.index)
+
+    async def region_alerts(self, request: web.Request) -> web.Response:
+        region_id = request.match_info['regionId']
+        return versioned_json_response(
+            request, [region for region in self.regions if region['regionId'] == region_id], self.index
+        )
+
+    async def alert_index(self, request: web.Request) -> web.Response:
+        return web.json_response({"lastActionIndex": self.index})
+
+    async def region_list(self, request: web.Request) -> web.Response:
+        return web.json_response({"states": []})
+
+    async def control_alerts(self, request: web.Request) -> web.Response:
+        self.set_alerts(await request.json())
+        return web.json_response({"lastActionIndex": self.index})
+
+
+async def serve(port: str = '8080', host: str = '127.0.0.1', delay: str = '0', fail: str = 'no'):
+    server = StubServer(host, int(port), float(delay), fail in ('yes', 'true', '1'))
+    await server.start()
+    print(f"Stub server listening on {server.url}")
+    print(f"POST a region list to http://{host}:{server.port}/control/alerts to publish alerts")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List
+
+import core
+import metrics
+import models
+from logs import logger
+
+
+class TransitionFilter:
+    """Debounces alert transitions between the diff and alarm_trigger.
+
+    An end is held back for flap_merge_window seconds, and at least until the alert has been active for its
+    flap_min_hold time; if the same alert starts again meanwhile, the end/start pair is dropped.
+    Every operation is a dict lookup plus at most one timer, so the cost per alert does not grow with regions.
+    Held-back ends are passed to release (default: emit) once they are due, so the caller can persist them.
+    """
+
+    def __init__(
+            self, emit: Callable[[models.AlertEvent], Awaitable],
+            release: Callable[[models.AlertEvent], Awaitable] = None
+    ):
+        self.emit = emit
+        self.release = release or emit
+        self.suppressed = 0
+        self._pending: Dict[models.AlertKey, asyncio.TimerHandle] = {}
+        self._pending_events: Dict[models.AlertKey, models.AlertEvent] = {}
+        self._started: Dict[models.AlertKey, float] = {}
+        self._releasing = set()
+
+    def held(self) -> List[models.Alert]:
+        return [event.alert for event in self._pending_events.values()]
+
+    def end_delay(self, alert: models.Alert, now: float) -> float:
+        conf = core.Config()
+        delay = conf.flap_merge_window
+
+        hold = conf.flap_min_hold.get(alert.type)
+        started = self._started.get(alert.key)
+        if hold and started is not None:
+            delay = max(delay, started + hold - now)
+        return delay
+
+    async def submit(self, event: models.AlertEvent):
+        loop = asyncio.get_running_loop()
+        key = event.alert.key
+
+        if event.alert_type == models.AlertEventType.start:
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                pending.cancel()
+                del self._pending_events[key]
+                self.suppressed += 2
+                metrics.Metrics.inc('suppressed_transitions_total', 2, alert_type=event.alert.type.value)
+                logger.info(f'Alert flap suppressed [{event.alert.regionId}] {event.alert.type.value}')
+                return
+
+            self._started[key] = loop.time()
+            await self.emit(event)
+            return
+
+        delay = self.end_delay(event.alert, loop.time())
+        if delay <= 0:
+            self._started.pop(key, None)
+            await self.emit(event)
+            return
+
+        if key not in self._pending:
+            self._pending_events[key] = event
+            self._pending[key] = loop.call_later(delay, self._release, key)
+
+    def _release(self, key: models.AlertKey):
+        del self._pending[key]
+        self._started.pop(key, None)
+        task = asyncio.get_running_loop().create_task(self.release(self._pending_events.pop(key)))
+        self._releasing.add(task)
+        task.add_done_callback(self._releasing.discard)
+
+    async def flush(self):
+        """Emit every held-back end now, e.g. on shutdown."""
+        for key in list(self._pending):
+            self._pending.pop(key).cancel()
+            self._started.pop(key, None)
+            await self.release(self._pending_events.pop(key))
+        if self._releasing:
+            await asyncio.gather(*self._releasing, return_exceptions=True)
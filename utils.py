@@ -1,24 +1,46 @@
 import asyncio
-
-import aiohttp
+import importlib
 
 import core
-from client import Client
+
+
+def lazy_command(module_name: str, func_name: str):
+    """Command that imports its module on first use, so heavy tooling does not slow down startup."""
+    async def command(*argv):
+        return await getattr(importlib.import_module(module_name), func_name)(*argv)
+
+    command.__qualname__ = f'{module_name}.{func_name}'
+    return command
 
 
 async def region_list():
-    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=core.Config().enable_ssl_validation)) as session:
-        print(await Client(session, core.Config().api_key).get_regions())
+    print(await core.Session.client().get_regions())
 
 
 COMMANDS = {
-    "regions": region_list
+    "regions": region_list,
+    "history": lazy_command("journal", "history"),
+    "stub-server": lazy_command("stub_server", "serve"),
+    "bench-stream": lazy_command("bench", "bench_stream"),
+    "bench-diff": lazy_command("bench", "bench_diff"),
+    "bench-decode": lazy_command("bench", "bench_decode"),
+    "bench-failover": lazy_command("bench", "bench_failover"),
+    "bench-replay": lazy_command("bench", "bench_replay"),
+    "bench-startup": lazy_command("bench", "bench_startup"),
+    "bench-workers": lazy_command("bench", "bench_workers"),
 }
 
 
-def console_command(command, *argv):
+async def run_command(command, *argv):
     try:
-        core.Config.load()
-        asyncio.run(COMMANDS[command](*argv))
-    except KeyError:
+        await COMMANDS[command](*argv)
+    finally:
+        await core.Session.close()
+
+
+def console_command(command, *argv):
+    if command not in COMMANDS:
         print("Wrong Command!")
+        return
+    core.Config.load()
+    asyncio.run(run_command(command, *argv))
@@ -0,0 +1,127 @@
+import asyncio
+import multiprocessing
+import pickle
+from multiprocessing.connection import Connection
+from typing import List
+
+import exceptions
+import executor
+import models
+from logs import logger
+
+
+def _serve(connection: Connection):
+    """Worker process loop: run each (action, event) request and send back ('ok', result) or ('error', exc)."""
+    loop = asyncio.new_event_loop()
+    while True:
+        try:
+            action, event = connection.recv()
+        except (EOFError, OSError):
+            return
+
+        try:
+            response = ('ok', loop.run_until_complete(executor.run_action(action.act(event), action.timeout)))
+        except Exception as exc:
+            response = ('error', exc)
+
+        try:
+            connection.send(response)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            connection.send(('error', exceptions.EventActionException(repr(response[1]))))
+
+
+class Worker:
+    def __init__(self, context):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_connection,), name='action-worker', daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """Warm worker processes for isolated actions, so a hung or crashing action cannot stall the event loop."""
+
+    HANG_GRACE = 5
+    DEFAULT_DEADLINE = 300
+
+    _context = multiprocessing.get_context('spawn')
+    _workers: List[Worker] = []
+    _idle: asyncio.Queue = None
+    _loop: asyncio.AbstractEventLoop = None
+
+    def __new__(cls, *args, **kwargs):
+        raise NotImplementedError()
+
+    @classmethod
+    def start(cls, size: int):
+        while len(cls._workers) < size:
+            worker = Worker(cls._context)
+            cls._workers.append(worker)
+            if cls._idle is not None:
+                cls._idle.put_nowait(worker)
+        logger.debug(f"Action workers running: {len(cls._workers)}")
+
+    @classmethod
+    def _bind(cls):
+        running_loop = asyncio.get_running_loop()
+        if cls._loop is not running_loop:
+            cls._loop = running_loop
+            cls._idle = asyncio.Queue()
+            for worker in cls._workers:
+                cls._idle.put_nowait(worker)
+
+    @classmethod
+    def _respawn(cls, worker: Worker) -> Worker:
+        worker.kill()
+        replacement = Worker(cls._context)
+        cls._workers[cls._workers.index(worker)] = replacement
+        return replacement
+
+    @classmethod
+    async def run(cls, action: models.AlertAction, event: models.AlertEvent):
+        """Run action.act(event) in a worker; the worker is replaced if it hangs past the action timeout or dies.
+
+        Actions without a timeout still get DEFAULT_DEADLINE, so a hung worker is always reclaimed.
+        """
+        if not cls._workers:
+            cls.start(1)
+        cls._bind()
+
+        worker = await cls._idle.get()
+        deadline = (WorkerPool.DEFAULT_DEADLINE if action.timeout is None else action.timeout) + WorkerPool.HANG_GRACE
+        try:
+            if not worker.process.is_alive():
+                worker = cls._respawn(worker)
+
+            worker.connection.send((action, event))
+            if not await cls._loop.run_in_executor(None, worker.connection.poll, deadline):
+                worker = cls._respawn(worker)
+                raise exceptions.ActionTimeoutException(f'Action worker hung for {deadline}s and was restarted')
+
+            status, result = worker.connection.recv()
+        except (EOFError, OSError) as exc:
+            worker = cls._respawn(worker)
+            raise exceptions.ActionWorkerException(f'Action worker died and was restarted: {exc!r}')
+        except asyncio.CancelledError:
+            worker = cls._respawn(worker)
+            raise
+        finally:
+            cls._idle.put_nowait(worker)
+
+        if status == 'error':
+            raise result
+        return result
+
+    @classmethod
+    def close(cls):
+        for worker in cls._workers:
+            worker.kill()
+        cls._workers = []
+        cls._idle = None
+        cls._loop = None